@@ -10,12 +10,27 @@ This script helps maintain a clean project directory by:
 """
 
 import os
+import re
+import sys
 import shutil
+import fnmatch
 import json
+import functools
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 import logging
 import argparse
 
+try:
+    import re2
+except ImportError:
+    re2 = None
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -24,39 +39,215 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Top-level files reported by list_remaining_files
+CORE_FILE_SUFFIXES = (".py", ".txt", ".json")
+
+# Linux ioctl to share extents between files (reflink) on Btrfs/XFS
+FICLONE = 0x40049409
+
+def _translate(pattern):
+    """fnmatch.translate without the trailing end anchor (callers use fullmatch)"""
+    regex = fnmatch.translate(pattern)
+    return regex[:-2] if regex.endswith(("\\Z", "\\z")) else regex
+
+@functools.lru_cache(maxsize=None)
+def _compiled_patterns(patterns):
+    """Compile a tuple of glob patterns into a single regex for fullmatch
+    
+    Uses RE2 (linear-time DFA matching) when google-re2 is installed and
+    accepts the pattern; globs with several '*' translate to lookaheads that
+    RE2 doesn't support, so those fall back to the re module.
+    """
+    regex = "|".join(_translate(p) for p in patterns)
+    if re2 is not None:
+        try:
+            return re2.compile(regex)
+        except re2.error:
+            pass
+    return re.compile(regex)
+
+def _clone(src_fd, dst_fd):
+    """Reflink dst to src's data; False if the filesystem can't clone"""
+    # FICLONE is a Linux ioctl number; on other platforms it means something else
+    if fcntl is None or not sys.platform.startswith("linux"):
+        return False
+    try:
+        fcntl.ioctl(dst_fd, FICLONE, src_fd)
+    except OSError:
+        return False
+    return True
+
+def _copy_range(src_fd, dst_fd):
+    """Copy src to dst in-kernel with copy_file_range; False if unsupported"""
+    if not hasattr(os, "copy_file_range"):
+        return False
+    remaining = os.fstat(src_fd).st_size
+    try:
+        while remaining > 0:
+            copied = os.copy_file_range(src_fd, dst_fd, remaining)
+            if copied == 0:
+                break
+            remaining -= copied
+    except OSError:
+        return False
+    # Some filesystems report 0 before the end; let shutil.copy2 redo it
+    return remaining <= 0
+
+def _fast_copy(src, dst):
+    """Copy src to dst with metadata, cloning or copying in-kernel where possible
+    
+    Tries a FICLONE reflink first (O(1) on copy-on-write filesystems), then
+    copy_file_range, and finally falls back to shutil.copy2.
+    """
+    # Opening dst for writing would truncate src if they are the same file
+    if os.path.exists(dst) and os.path.samefile(src, dst):
+        raise shutil.SameFileError(f"{src!r} and {dst!r} are the same file")
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        copied = _clone(fsrc.fileno(), fdst.fileno()) or _copy_range(fsrc.fileno(), fdst.fileno())
+    if copied:
+        shutil.copystat(src, dst)
+    else:
+        shutil.copy2(src, dst)
+
 class DirectoryCleaner:
     def __init__(self, dry_run=False):
         self.dry_run = dry_run
         self.backup_dir = None
+        self.remaining_files = None
         
     def backup_files(self, files_to_backup):
-        """Create backups of files before removal"""
+        """Create backups of files before removal
+        
+        Returns the sources that could not be backed up, so the caller can
+        leave them in place.
+        """
+        failed = []
         if not files_to_backup:
-            return None
+            return failed
             
         self.backup_dir = "backup_" + datetime.now().strftime("%Y%m%d_%H%M%S")
         if not self.dry_run:
-            os.makedirs(self.backup_dir)
-            for file in files_to_backup:
-                if os.path.exists(file):
-                    shutil.copy2(file, os.path.join(self.backup_dir, file))
+            copies = [(file, os.path.join(self.backup_dir, file)) for file in files_to_backup]
+            # Create each destination directory once, including nested ones
+            for parent in {os.path.dirname(dst) for _, dst in copies}:
+                os.makedirs(parent, exist_ok=True)
+            with ThreadPoolExecutor(max_workers=min(32, len(copies))) as pool:
+                futures = {pool.submit(self._copy_if_exists, src, dst): src
+                           for src, dst in copies}
+                for future in as_completed(futures):
+                    try:
+                        future.result()
+                    except OSError as e:
+                        failed.append(futures[future])
+                        logger.error(f"Failed to back up {futures[future]}: {e}")
         logger.info(f"Backup created in: {self.backup_dir}")
-        return self.backup_dir
+        return failed
+    
+    def _copy_if_exists(self, src, dst):
+        """Copy src to dst, ignoring a source that doesn't exist (EAFP, no pre-stat)"""
+        try:
+            _fast_copy(src, dst)
+        except FileNotFoundError:
+            return False
+        return True
+    
+    def _unlink_batch(self, paths):
+        """Unlink files grouped by parent directory, returning the paths removed
+        
+        Each parent directory is opened once and its entries are removed with
+        unlinkat() relative to that descriptor, so the kernel doesn't resolve
+        the full path again for every file.
+        """
+        by_dir = {}
+        for path in paths:
+            by_dir.setdefault(os.path.dirname(path) or ".", []).append(path)
+        
+        removed = []
+        use_dir_fd = os.unlink in os.supports_dir_fd
+        for dirname, dir_paths in by_dir.items():
+            dir_fd = None
+            if use_dir_fd:
+                try:
+                    dir_fd = os.open(dirname, os.O_RDONLY | getattr(os, "O_DIRECTORY", 0))
+                except FileNotFoundError:
+                    continue
+                except OSError as e:
+                    logger.warning(f"Could not open {dirname}: {e}")
+                    continue
+            try:
+                for path in dir_paths:
+                    try:
+                        if dir_fd is None:
+                            os.unlink(path)
+                        else:
+                            os.unlink(os.path.basename(path), dir_fd=dir_fd)
+                    except FileNotFoundError:
+                        continue
+                    except OSError as e:
+                        logger.warning(f"Could not remove {path}: {e}")
+                        continue
+                    removed.append(path)
+            finally:
+                if dir_fd is not None:
+                    os.close(dir_fd)
+        return removed
     
     def remove_files(self, files):
-        """Remove specified files"""
-        for file in files:
-            if os.path.exists(file):
-                if not self.dry_run:
-                    os.remove(file)
-                logger.info(f"Removed: {file}")
+        """Remove specified files
+        
+        Removal is attempted directly and missing files are skipped (EAFP),
+        rather than checking os.path.exists first; only a dry run needs to stat.
+        """
+        if self.dry_run:
+            removed = [file for file in files if os.path.exists(file)]
+        else:
+            removed = self._unlink_batch(files)
+        for file in removed:
+            logger.info(f"Removed: {file}")
     
     def clean_cache(self, patterns):
-        """Clean cache files matching patterns"""
-        for pattern in patterns:
-            if not self.dry_run:
-                os.system(f"find . -name '{pattern}' -type f -delete")
-            logger.info(f"Cleaned cache files: {pattern}")
+        """Clean cache files and directories matching patterns in a single walk
+        
+        The same walk records the top-level core files into remaining_files,
+        so list_remaining_files doesn't need another directory scan.
+        """
+        patterns = tuple(patterns)
+        regex = _compiled_patterns(patterns)
+        
+        removed = 0
+        matched_files = []
+        core_files = []
+        pending = ["."]
+        while pending:
+            dirpath = pending.pop()
+            try:
+                with os.scandir(dirpath) as entries:
+                    for entry in entries:
+                        try:
+                            is_dir = entry.is_dir(follow_symlinks=False)
+                            if dirpath == "." and not is_dir and entry.name.endswith(CORE_FILE_SUFFIXES):
+                                core_files.append((entry.name, entry.stat().st_size))
+                            if regex.fullmatch(entry.name):
+                                if not is_dir:
+                                    matched_files.append(entry.path)
+                                    continue
+                                if not self.dry_run:
+                                    shutil.rmtree(entry.path)
+                                removed += 1
+                            elif is_dir:
+                                pending.append(entry.path)
+                        except OSError as e:
+                            logger.warning(f"Skipping {entry.path}: {e}")
+            except OSError as e:
+                # Unreadable or vanished directory; keep cleaning the rest
+                logger.warning(f"Could not scan {dirpath}: {e}")
+        
+        if self.dry_run:
+            removed += len(matched_files)
+        else:
+            removed += len(self._unlink_batch(matched_files))
+        self.remaining_files = sorted(core_files)
+        logger.info(f"Cleaned {removed} cache entries: {', '.join(patterns)}")
     
     def check_venv(self):
         """Check virtual environment status"""
@@ -68,8 +259,14 @@ class DirectoryCleaner:
     
     def list_remaining_files(self):
         """List remaining core files"""
+        files = self.remaining_files
+        if files is None:
+            with os.scandir(".") as entries:
+                files = sorted((entry.name, entry.stat().st_size) for entry in entries
+                               if entry.is_file() and entry.name.endswith(CORE_FILE_SUFFIXES))
         logger.info("\nRemaining core files:")
-        os.system("ls -l *.py *.txt *.json")
+        for name, size in files:
+            logger.info(f"  {name:<30} {size:>8} bytes")
 
 def get_cleanup_config():
     """Get configuration for cleanup"""
@@ -86,13 +283,13 @@ def get_cleanup_config():
             "simple_relay.py",     # Test only
             "simple_test.py",      # Test only
         ],
-        "cache_patterns": [
+        "cache_patterns": (
             "__pycache__",
             "*.pyc",
             "*.pyo",
             "*.pyd",
             ".DS_Store"
-        ]
+        )
     }
 
 def main():
@@ -125,8 +322,10 @@ def main():
                 return
         
         # Execute cleanup
-        cleaner.backup_files(config["files_to_remove"])
-        cleaner.remove_files(config["files_to_remove"])
+        failed = set(cleaner.backup_files(config["files_to_remove"]))
+        if failed:
+            logger.warning(f"Keeping files without a backup: {', '.join(sorted(failed))}")
+        cleaner.remove_files([file for file in config["files_to_remove"] if file not in failed])
         cleaner.clean_cache(config["cache_patterns"])
         cleaner.check_venv()
         cleaner.list_remaining_files()
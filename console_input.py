@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Console Input for asyncio Menus
+
+input() run on the default executor can't be interrupted: on Ctrl-C,
+asyncio.run waits for the executor to finish, so the program hangs until
+Enter is pressed. Lines are read on a daemon thread instead and handed to
+the event loop through a queue, so cancelling a prompt returns at once.
+"""
+
+import sys
+import asyncio
+import threading
+
+class ConsoleReader:
+    """Read stdin lines on a daemon thread for the running event loop"""
+
+    def __init__(self):
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        # Set by input() so only asked-for lines are read, like input() itself
+        self._wanted = threading.Event()
+        self._eof = False
+        threading.Thread(target=self._read, name='console-reader', daemon=True).start()
+
+    def _read(self):
+        while True:
+            self._wanted.wait()
+            self._wanted.clear()
+            try:
+                line = sys.stdin.readline()
+            except (OSError, ValueError):
+                line = ''
+            try:
+                self._loop.call_soon_threadsafe(self._queue.put_nowait, line)
+            except RuntimeError:
+                # Event loop already closed
+                return
+            if not line:
+                return
+
+    async def input(self, prompt=''):
+        """Like input(), but awaitable and cancellable; raises EOFError at end of input"""
+        if self._eof:
+            raise EOFError
+        sys.stdout.write(prompt)
+        sys.stdout.flush()
+        self._wanted.set()
+        line = await self._queue.get()
+        if not line:
+            self._eof = True
+            raise EOFError
+        return line.rstrip('\n')
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+CH340 Driver Download Checks
+
+Shared by install_ch340.py and scripts/install_ch340_mac.py. The driver
+package is installed as root, so a download is only trusted when it is a
+zip matching the SHA-256 pinned in CH340_DRIVER_SHA256.
+"""
+
+import os
+import hashlib
+import zipfile
+import logging
+
+logger = logging.getLogger(__name__)
+
+# SHA-256 of the driver zip the installers may install, taken from a release
+# you have checked. Without it nothing is downloaded automatically.
+DRIVER_SHA256 = os.environ.get('CH340_DRIVER_SHA256', '').strip().lower()
+
+def file_sha256(path):
+    """SHA-256 of a file, read in 1 MiB chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def verify_driver_zip(path):
+    """Check path is a zip archive matching DRIVER_SHA256, if one is pinned"""
+    if not zipfile.is_zipfile(path):
+        logger.error(f"{path} is not a zip archive")
+        return False
+
+    digest = file_sha256(path)
+    if DRIVER_SHA256:
+        if digest != DRIVER_SHA256:
+            logger.error(f"{path} SHA-256 {digest} does not match the pinned {DRIVER_SHA256}")
+            return False
+        logger.info("✓ Driver checksum verified")
+    else:
+        logger.warning(f"No pinned driver checksum; {path} SHA-256 is {digest}")
+    return True
@@ -9,14 +9,91 @@ logging.basicConfig(
 import tkinter as tk
 from tkinter import ttk, messagebox
 import json
+import mmap
 import os
+import sys
+import queue
+import threading
 from datetime import datetime
-import subprocess
-import signal
-import psutil
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 logger = logging.getLogger(__name__)
 
+# Fallback status poll; normal updates are driven by user actions and process exit
+STATUS_POLL_INTERVAL_MS = 5000
+
+# How often the Tk thread checks for a watched process exit
+PROC_EXIT_CHECK_MS = 200
+
+# Delay before a pause/resume state change is written to config.json
+CONFIG_FLUSH_DELAY_MS = 250
+
+# Type used to convert each configuration field when saving; unlisted fields are int
+FIELD_TYPES = {
+    'obd_port': str,
+    'relay_vendor_id': str,
+    'relay_product_id': str,
+    'constant_current_amps': float,
+    'min_current_threshold': float,
+    'cycle_end_current_threshold': float,
+    'use_discharge_resistor': bool,
+    'use_constant_current': bool,
+}
+
+def _load_json(path):
+    """Read a JSON file, using orjson when it is installed"""
+    if orjson is not None:
+        with open(path, 'rb') as f:
+            return orjson.loads(f.read())
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def _load_json_mapped(path):
+    """Read a potentially large JSON file by parsing directly from an mmap
+    
+    With orjson the mapped bytes are parsed in place, avoiding a read()
+    copy and str decode; without it this is the same as _load_json.
+    """
+    if orjson is None:
+        return _load_json(path)
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return orjson.loads(b'')  # Raise the usual decode error
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            with memoryview(mm) as view:
+                return orjson.loads(view)
+
+def _dump_json(data, path):
+    """Write data as JSON to path, using orjson when it is installed
+    
+    orjson only indents by two spaces, so the fallback does the same and the
+    file comes out identical either way.
+    """
+    if orjson is not None:
+        with open(path, 'wb') as f:
+            f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+    else:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+
+def _cycle_row(cycle, mode):
+    """Build the Treeview values for one charge/discharge cycle"""
+    # Plain f-strings benchmarked faster than a shared format template + split
+    return (
+        cycle['timestamp'],
+        f"{cycle['capacity_ah']:.2f}",
+        f"{cycle['duration_hours']:.2f}",
+        f"{cycle['start_voltage']:.1f}",
+        f"{cycle['end_voltage']:.1f}",
+        f"{cycle['start_current']:.1f}",
+        f"{cycle['end_current']:.1f}",
+        mode
+    )
+
 class ConfigGUI:
     def __init__(self, root):
         try:
@@ -24,6 +101,30 @@ class ConfigGUI:
             self.root.title("Hybrid Battery Monitor Configuration")
             self.root.geometry("800x800")
             
+            # psutil.Process handles keyed by pid, reused across status ticks
+            self._proc_cache = {}
+            # Popen handle of the monitoring process started by this GUI
+            self._proc = None
+            
+            # Parsed config.json, re-read only when its mtime changes
+            self._cfg = None
+            self._cfg_mtime = None
+            self._cfg_last_written = None
+            self._flush_after_id = None
+            
+            # mtime of the cycle data file when the history view was last filled
+            self._history_mtime = None
+            
+            # Status refresh state: pending-refresh flag and pid being waited on
+            self._status_dirty = False
+            self._watched_pid = None
+            # Exit notices from the watcher thread, drained on the Tk thread
+            self._exit_queue = queue.Queue()
+            self._exit_check_id = None
+            # Last status text / button state applied, to skip no-op widget updates
+            self._last_status_text = None
+            self._last_button_state = None
+            
             # Create notebook for tabs
             self.notebook = ttk.Notebook(root)
             self.notebook.pack(fill='both', expand=True, padx=10, pady=5)
@@ -37,11 +138,23 @@ class ConfigGUI:
             
             # Add control buttons
             self.setup_control_buttons()
+            self.root.after_idle(self._poll_status)
             
             # Configuration tab
             self.config_frame = ttk.Frame(self.notebook)
             self.notebook.add(self.config_frame, text='Configuration')
             
+            # History tab
+            self.history_frame = ttk.Frame(self.notebook)
+            self.notebook.add(self.history_frame, text='Capacity History')
+            
+            # Fill the tabs once the window has been drawn
+            self.root.after_idle(self.setup_config_tab)
+            self.root.after_idle(self.setup_history_tab)
+            
+            # Write out any debounced config change before the window goes
+            self.root.protocol("WM_DELETE_WINDOW", self._on_close)
+            
         except Exception as e:
             logger.error(f"Error initializing GUI: {e}")
             messagebox.showerror("Error", f"Failed to initialize application: {e}")
@@ -50,14 +163,48 @@ class ConfigGUI:
     def load_config(self):
         """Load configuration from file"""
         try:
-            with open('config.json', 'r') as f:
-                self.config = json.load(f)
+            self.config = _load_json('config.json')
             logger.info("Configuration loaded successfully")
         except Exception as e:
             logger.error(f"Error loading configuration: {e}")
             messagebox.showerror("Error", f"Failed to load configuration: {e}")
             raise
 
+    def _load_config_cached(self):
+        """Return the parsed config.json, re-reading it only when it has changed on disk"""
+        mtime = os.stat('config.json').st_mtime_ns
+        if self._cfg is None or mtime != self._cfg_mtime:
+            self._cfg = _load_json('config.json')
+            self._cfg_mtime = mtime
+            self._cfg_last_written = dict(self._cfg)
+        return self._cfg
+
+    def _save_config(self, cfg):
+        """Write cfg to config.json, skipping the write when nothing changed"""
+        if cfg == self._cfg_last_written:
+            return
+        _dump_json(cfg, 'config.json')
+        self._cfg = cfg
+        self._cfg_last_written = dict(cfg)
+        self._cfg_mtime = os.stat('config.json').st_mtime_ns
+
+    def _schedule_config_flush(self):
+        """Persist the cached config shortly, coalescing rapid state changes"""
+        if self._flush_after_id is not None:
+            self.root.after_cancel(self._flush_after_id)
+        self._flush_after_id = self.root.after(CONFIG_FLUSH_DELAY_MS, self._flush_config)
+
+    def _flush_config(self):
+        self._flush_after_id = None
+        self._save_config(self._cfg)
+
+    def _on_close(self):
+        """Flush a pending config write, then close the window"""
+        if self._flush_after_id is not None:
+            self.root.after_cancel(self._flush_after_id)
+            self._flush_config()
+        self.root.destroy()
+
     def setup_control_buttons(self):
         # Create frames for better organization
         button_frame = ttk.Frame(self.control_frame)
@@ -77,51 +224,107 @@ class ConfigGUI:
         self.reset_button = ttk.Button(button_frame, text="Reset", command=self.reset_monitoring)
         self.reset_button.pack(side='right', padx=5)
 
+    def _poll_status(self):
+        """Slow fallback poll in case a state change was missed"""
+        self.update_button_states()
+        self.root.after(STATUS_POLL_INTERVAL_MS, self._poll_status)
+
+    def _request_status_update(self):
+        """Schedule a single status refresh for the next idle moment"""
+        if not self._status_dirty:
+            self._status_dirty = True
+            self.root.after_idle(self.update_button_states)
+
+    def _watch_process(self, pid):
+        """Wait for the monitoring process this GUI started to exit on a background thread
+        
+        Processes left over from an earlier session aren't our children, so
+        those are left to the fallback poll.
+        """
+        proc = self._proc
+        if proc is None or proc.pid != pid or pid == self._watched_pid:
+            return
+        self._watched_pid = pid
+        
+        def wait():
+            proc.wait()
+            # Tk isn't thread safe; hand the exit over to the Tk thread
+            self._exit_queue.put(pid)
+        
+        threading.Thread(target=wait, daemon=True).start()
+        if self._exit_check_id is None:
+            self._exit_check_id = self.root.after(PROC_EXIT_CHECK_MS, self._check_proc_exit)
+
+    def _check_proc_exit(self):
+        """Handle exits reported by the watcher thread; runs only while one is watched"""
+        self._exit_check_id = None
+        try:
+            while True:
+                self._on_proc_exit(self._exit_queue.get_nowait())
+        except queue.Empty:
+            pass
+        if self._watched_pid is not None:
+            self._exit_check_id = self.root.after(PROC_EXIT_CHECK_MS, self._check_proc_exit)
+
+    def _on_proc_exit(self, pid):
+        if self._watched_pid == pid:
+            self._watched_pid = None
+        self._proc_cache.pop(pid, None)
+        self._request_status_update()
+
     def update_button_states(self):
+        import psutil
+        
+        self._status_dirty = False
         try:
-            with open('config.json', 'r') as f:
-                config = json.load(f)
+            config = self._load_config_cached()
             
             state = config.get('monitoring_state', 'stopped')
             pid = config.get('monitoring_pid')
             
             # Update status label
             status_text = f"Status: {state.capitalize()}"
-            if pid:
+            if pid and state != 'stopped':
                 try:
-                    process = psutil.Process(pid)
+                    process = self._get_proc(pid)
                     if not process.is_running() or process.status() == psutil.STATUS_ZOMBIE:
                         status_text += " (Process Dead)"
+                        self._proc_cache.pop(pid, None)
                         # Auto-cleanup dead process
                         config['monitoring_state'] = 'stopped'
                         config['monitoring_pid'] = None
-                        with open('config.json', 'w') as f:
-                            json.dump(config, f, indent=4)
+                        self._save_config(config)
+                    else:
+                        self._watch_process(pid)
                 except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.TimeoutError):
+                    self._proc_cache.pop(pid, None)
                     status_text += " (Process Not Found)"
                     # Auto-cleanup missing process
                     config['monitoring_state'] = 'stopped'
                     config['monitoring_pid'] = None
-                    with open('config.json', 'w') as f:
-                        json.dump(config, f, indent=4)
-            self.status_label.config(text=status_text)
+                    self._save_config(config)
+            if status_text != self._last_status_text:
+                self.status_label.config(text=status_text)
+                self._last_status_text = status_text
             
             # Update button states based on actual process state
             if state == 'running' and (not pid or not self._is_process_running(pid)):
                 state = 'stopped'  # Override state if process is not actually running
             
-            if state == 'running':
-                self.start_button.config(text="Stop", command=self.stop_monitoring)
-                self.pause_button.config(state='normal')
-                self.reset_button.config(state='disabled')
-            elif state == 'paused':
-                self.start_button.config(text="Stop", command=self.stop_monitoring)
-                self.pause_button.config(text="Resume", command=self.resume_monitoring, state='normal')
-                self.reset_button.config(state='disabled')
-            else:  # stopped
-                self.start_button.config(text="Start", command=self.start_monitoring)
-                self.pause_button.config(text="Pause", command=self.pause_monitoring, state='disabled')
-                self.reset_button.config(state='normal')
+            if state != self._last_button_state:
+                if state == 'running':
+                    self.start_button.config(text="Stop", command=self.stop_monitoring)
+                    self.pause_button.config(text="Pause", command=self.pause_monitoring, state='normal')
+                    self.reset_button.config(state='disabled')
+                elif state == 'paused':
+                    self.start_button.config(text="Stop", command=self.stop_monitoring)
+                    self.pause_button.config(text="Resume", command=self.resume_monitoring, state='normal')
+                    self.reset_button.config(state='disabled')
+                else:  # stopped
+                    self.start_button.config(text="Start", command=self.start_monitoring)
+                    self.pause_button.config(text="Pause", command=self.pause_monitoring, state='disabled')
+                    self.reset_button.config(state='normal')
+                self._last_button_state = state
         
         except Exception as e:
             logger.error(f"Error updating button states: {e}")
@@ -130,45 +333,106 @@ class ConfigGUI:
             self.start_button.config(text="Start", command=self.start_monitoring)
             self.pause_button.config(state='disabled')
             self.reset_button.config(state='normal')
+            self._last_button_state = None
+
+    def _get_proc(self, pid):
+        """Return a cached psutil.Process for pid, creating it on first use"""
+        import psutil
         
-        # Schedule next update
-        self.root.after(1000, self.update_button_states)
+        process = self._proc_cache.get(pid)
+        if process is None:
+            process = psutil.Process(pid)
+            self._proc_cache[pid] = process
+        return process
 
     def _is_process_running(self, pid):
         """Helper method to check if a process is running"""
+        import psutil
+        
         try:
-            process = psutil.Process(pid)
+            process = self._get_proc(pid)
             return process.is_running() and process.status() != psutil.STATUS_ZOMBIE
         except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.TimeoutError):
+            self._proc_cache.pop(pid, None)
+            return False
+
+    def _signal_monitor(self, pid, sig):
+        """Send sig to the monitoring process, returning False if pid isn't it
+        
+        The Popen this GUI started is signalled directly. A pid left in
+        config.json by an earlier session is only signalled after psutil
+        confirms it is still a live main.py, since the OS may have reused it.
+        """
+        import psutil
+        
+        if self._proc is not None and self._proc.pid == pid:
+            if self._proc.poll() is not None:
+                return False
+            self._proc.send_signal(sig)
+            return True
+        
+        try:
+            # A cached handle remembers the create time it first saw, so
+            # is_running() is False if the pid now belongs to another process
+            process = self._get_proc(pid)
+            if not process.is_running() or process.status() == psutil.STATUS_ZOMBIE or \
+                    not any(os.path.basename(arg) == 'main.py' for arg in process.cmdline()):
+                self._proc_cache.pop(pid, None)
+                return False
+            # psutil checks the create time again before signalling
+            process.send_signal(sig)
+            return True
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            self._proc_cache.pop(pid, None)
             return False
 
     def start_monitoring(self):
+        import subprocess
+        
         try:
             # Start the monitoring script
-            process = subprocess.Popen(['python', 'main.py'])
+            process = subprocess.Popen(
+                [sys.executable, 'main.py'],
+                start_new_session=True,
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL
+            )
+            self._proc = process
             
             # Update config with process state
-            with open('config.json', 'r') as f:
-                config = json.load(f)
+            config = self._load_config_cached()
             
             config['monitoring_state'] = 'running'
             config['monitoring_pid'] = process.pid
             
-            with open('config.json', 'w') as f:
-                json.dump(config, f, indent=4)
+            self._save_config(config)
+            self._watch_process(process.pid)
+            self._request_status_update()
             
         except Exception as e:
             messagebox.showerror("Error", f"Error starting monitoring: {e}")
 
     def stop_monitoring(self):
+        import psutil
+        import subprocess
+        
         try:
-            with open('config.json', 'r') as f:
-                config = json.load(f)
+            config = self._load_config_cached()
             
             pid = config.get('monitoring_pid')
-            if pid:
+            if self._proc is not None and self._proc.pid == pid:
+                self._proc.terminate()  # Try graceful termination first
                 try:
-                    process = psutil.Process(pid)
+                    self._proc.wait(timeout=3)  # Wait up to 3 seconds
+                except subprocess.TimeoutExpired:
+                    self._proc.kill()  # Force kill if not terminated
+                    self._proc.wait()
+                self._proc = None
+                self._proc_cache.pop(pid, None)
+            elif pid:
+                try:
+                    process = self._get_proc(pid)
                     if process.is_running():
                         process.terminate()  # Try graceful termination first
                         try:
@@ -177,13 +441,14 @@ class ConfigGUI:
                             process.kill()  # Force kill if not terminated
                 except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.TimeoutError):
                     pass  # Process already terminated or inaccessible
+                self._proc_cache.pop(pid, None)
             
             config['monitoring_state'] = 'stopped'
             config['monitoring_pid'] = None
             
-            with open('config.json', 'w') as f:
-                json.dump(config, f, indent=4)
+            self._save_config(config)
             
+            self._request_status_update()
             logger.info("Monitoring stopped successfully")
             
         except Exception as e:
@@ -191,54 +456,52 @@ class ConfigGUI:
             messagebox.showerror("Error", f"Error stopping monitoring: {e}")
 
     def pause_monitoring(self):
+        import signal
+        
         try:
-            with open('config.json', 'r') as f:
-                config = json.load(f)
+            config = self._load_config_cached()
             
             pid = config.get('monitoring_pid')
-            if pid and self._is_process_running(pid):
-                try:
-                    os.kill(pid, signal.SIGSTOP)  # Pause process
-                    config['monitoring_state'] = 'paused'
-                    logger.info("Monitoring paused successfully")
-                except ProcessLookupError:
-                    logger.error("Process not found when trying to pause")
-                    messagebox.showerror("Error", "Process not found when trying to pause")
-                    return
-            else:
+            if not pid:
                 logger.error("No running process found to pause")
                 messagebox.showerror("Error", "No running process found to pause")
                 return
             
-            with open('config.json', 'w') as f:
-                json.dump(config, f, indent=4)
+            if not self._signal_monitor(pid, signal.SIGSTOP):  # Pause process
+                logger.error("Process not found when trying to pause")
+                messagebox.showerror("Error", "Process not found when trying to pause")
+                return
+            config['monitoring_state'] = 'paused'
+            logger.info("Monitoring paused successfully")
+            
+            self._schedule_config_flush()
+            self._request_status_update()
             
         except Exception as e:
             logger.error(f"Error pausing monitoring: {e}")
             messagebox.showerror("Error", f"Error pausing monitoring: {e}")
 
     def resume_monitoring(self):
+        import signal
+        
         try:
-            with open('config.json', 'r') as f:
-                config = json.load(f)
+            config = self._load_config_cached()
             
             pid = config.get('monitoring_pid')
-            if pid and self._is_process_running(pid):
-                try:
-                    os.kill(pid, signal.SIGCONT)  # Resume process
-                    config['monitoring_state'] = 'running'
-                    logger.info("Monitoring resumed successfully")
-                except ProcessLookupError:
-                    logger.error("Process not found when trying to resume")
-                    messagebox.showerror("Error", "Process not found when trying to resume")
-                    return
-            else:
+            if not pid:
                 logger.error("No paused process found to resume")
                 messagebox.showerror("Error", "No paused process found to resume")
                 return
             
-            with open('config.json', 'w') as f:
-                json.dump(config, f, indent=4)
+            if not self._signal_monitor(pid, signal.SIGCONT):  # Resume process
+                logger.error("Process not found when trying to resume")
+                messagebox.showerror("Error", "Process not found when trying to resume")
+                return
+            config['monitoring_state'] = 'running'
+            logger.info("Monitoring resumed successfully")
+            
+            self._schedule_config_flush()
+            self._request_status_update()
             
         except Exception as e:
             logger.error(f"Error resuming monitoring: {e}")
@@ -251,8 +514,7 @@ class ConfigGUI:
                 'charge_cycles': [],
                 'discharge_cycles': []
             }
-            with open(self.config['cycle_data_file'], 'w') as f:
-                json.dump(cycle_data, f, indent=4)
+            _dump_json(cycle_data, self.config['cycle_data_file'])
             
             # Refresh the history view
             self.refresh_capacity_history()
@@ -426,42 +688,37 @@ class ConfigGUI:
         
         return tree
 
+    def _fill_tree(self, tree, rows):
+        """Replace all rows in tree, hiding its columns while it is rebuilt"""
+        tree.configure(displaycolumns=())
+        try:
+            tree.delete(*tree.get_children())
+            for values in rows:
+                tree.insert('', 'end', values=values)
+        finally:
+            tree.configure(displaycolumns='#all')
+
     def refresh_capacity_history(self):
         try:
-            with open(self.config['cycle_data_file'], 'r') as file:
-                history = json.load(file)
+            path = self.config['cycle_data_file']
+            mtime = os.stat(path).st_mtime_ns
+            if mtime != self._history_mtime:
+                history = _load_json_mapped(path)
+                
+                charge_rows = [
+                    _cycle_row(cycle, "Constant Current" if cycle.get('constant_current', False) else "Normal")
+                    for cycle in reversed(history.get('charge_cycles', []))
+                ]
+                discharge_rows = [
+                    _cycle_row(cycle, "Resistor" if cycle.get('using_resistor', False) else "Vehicle")
+                    for cycle in reversed(history.get('discharge_cycles', []))
+                ]
                 
-            # Clear existing items
-            self.charge_tree.delete(*self.charge_tree.get_children())
-            self.discharge_tree.delete(*self.discharge_tree.get_children())
-            
-            # Add charge cycles
-            for cycle in reversed(history.get('charge_cycles', [])):
-                mode = "Constant Current" if cycle.get('constant_current', False) else "Normal"
-                self.charge_tree.insert('', 'end', values=(
-                    cycle['timestamp'],
-                    f"{cycle['capacity_ah']:.2f}",
-                    f"{cycle['duration_hours']:.2f}",
-                    f"{cycle['start_voltage']:.1f}",
-                    f"{cycle['end_voltage']:.1f}",
-                    f"{cycle['start_current']:.1f}",
-                    f"{cycle['end_current']:.1f}",
-                    mode
-                ))
-            
-            # Add discharge cycles
-            for cycle in reversed(history.get('discharge_cycles', [])):
-                mode = "Resistor" if cycle.get('using_resistor', False) else "Vehicle"
-                self.discharge_tree.insert('', 'end', values=(
-                    cycle['timestamp'],
-                    f"{cycle['capacity_ah']:.2f}",
-                    f"{cycle['duration_hours']:.2f}",
-                    f"{cycle['start_voltage']:.1f}",
-                    f"{cycle['end_voltage']:.1f}",
-                    f"{cycle['start_current']:.1f}",
-                    f"{cycle['end_current']:.1f}",
-                    mode
-                ))
+                self._fill_tree(self.charge_tree, charge_rows)
+                self._fill_tree(self.discharge_tree, discharge_rows)
+                self._history_mtime = mtime
+        except FileNotFoundError:
+            pass  # No cycles recorded yet
         except Exception as e:
             messagebox.showerror("Error", f"Error refreshing capacity history: {e}")
         
@@ -470,20 +727,17 @@ class ConfigGUI:
 
     def save_config(self):
         try:
-            # Convert values to appropriate types
-            config = {}
+            # Convert values to appropriate types, keeping the keys the form doesn't show
+            config = dict(self._load_config_cached())
             for key, var in self.vars.items():
-                if isinstance(var, tk.BooleanVar):
-                    config[key] = var.get()
-                elif key in ['obd_port', 'relay_vendor_id', 'relay_product_id']:
-                    config[key] = var.get()
-                elif key in ['constant_current_amps']:
-                    config[key] = float(var.get())
-                else:
-                    config[key] = int(var.get())
-            
-            with open('config.json', 'w') as file:
-                json.dump(config, file, indent=4)
+                field_type = FIELD_TYPES.get(key, int)
+                value = var.get()
+                if field_type is str and not value.strip():
+                    # Optional text field left blank
+                    continue
+                config[key] = field_type(value)
+            
+            self._save_config(config)
             messagebox.showinfo("Success", "Configuration saved successfully!")
         except ValueError as e:
             messagebox.showerror("Error", "Please enter valid numeric values where required!")
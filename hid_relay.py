@@ -7,6 +7,11 @@ Specifically for Mac M-series compatibility
 import hid
 import time
 import logging
+from log_setup import configure
+
+# HID report payload size (the report ID byte comes first)
+REPORT_SIZE = 8
+_EMPTY_REPORT = bytes(REPORT_SIZE)
 
 class HIDRelay:
     """NOYITO USB HID Relay Controller"""
@@ -15,23 +20,28 @@ class HIDRelay:
         self.vendor_id = vendor_id
         self.product_id = product_id
         self.device = None
+        self.manufacturer = None
+        self.product = None
         self.logger = logging.getLogger(__name__)
+        # Output report frame reused for every command: report ID 0x00 + payload
+        self._tx_buf = bytearray(1 + REPORT_SIZE)
         
     def connect(self):
         """Connect to the relay device"""
         try:
-            # List all HID devices
-            self.logger.info("Searching for HID devices...")
-            for device in hid.enumerate():
-                if device['vendor_id'] == self.vendor_id and device['product_id'] == self.product_id:
-                    self.logger.info(f"Found relay device: {device.get('manufacturer_string', 'N/A')}")
+            # Listing matching devices walks the whole USB bus, so only do it for debugging
+            if self.logger.isEnabledFor(logging.DEBUG):
+                for device in hid.enumerate(self.vendor_id, self.product_id):
+                    self.logger.debug(f"Found relay device: {device.get('manufacturer_string', 'N/A')}")
                     
-            # Open our relay
+            # Open our relay; open() raises if it isn't present
             self.device = hid.device()
             self.device.open(self.vendor_id, self.product_id)
             self.device.set_nonblocking(1)
             
-            self.logger.info(f"Connected to: {self.device.get_manufacturer_string()} {self.device.get_product_string()}")
+            self.manufacturer = self.device.get_manufacturer_string()
+            self.product = self.device.get_product_string()
+            self.logger.info(f"Connected to: {self.manufacturer} {self.product}")
             return True
             
         except Exception as e:
@@ -39,39 +49,50 @@ class HIDRelay:
             return False
     
     def send_command(self, data):
-        """Send raw command to relay"""
+        """Send raw command to relay
+        
+        The relay doesn't need a reply to switch, so nothing is read back;
+        use read_response() when a reply is actually wanted.
+        """
         if not self.device:
             raise RuntimeError("Device not connected")
             
+        if len(data) > REPORT_SIZE:
+            raise ValueError(f"Command longer than {REPORT_SIZE} bytes")
+            
         try:
-            # Ensure first byte is 0x00 (report ID)
-            if not isinstance(data, (list, bytes)):
-                data = [data]
-            if isinstance(data, list):
-                data = [0x00] + data
-            else:
-                data = b'\x00' + data
+            # Fill the preallocated frame in place; byte 0 stays 0x00 (report ID)
+            buf = self._tx_buf
+            buf[1:] = _EMPTY_REPORT
+            buf[1:1 + len(data)] = data
                 
             # Send command
-            self.logger.debug(f"Sending: {[hex(x) for x in data]}")
-            self.device.write(data)
-            
-            # Wait for response
-            time.sleep(0.05)
+            if self.logger.isEnabledFor(logging.DEBUG):
+                self.logger.debug(f"Sending: {[hex(x) for x in buf]}")
+            self.device.write(buf)
             
-            # Try to read response
-            try:
-                response = self.device.read(64, timeout_ms=100)
-                if response:
-                    self.logger.debug(f"Response: {[hex(x) for x in response]}")
-                return True
-            except:
-                return True  # Some commands don't return data
+            # Log any reply already waiting, without blocking
+            if self.logger.isEnabledFor(logging.DEBUG):
+                self.read_response()
+            return True
                 
         except Exception as e:
             self.logger.error(f"Command failed: {e}")
             return False
     
+    def read_response(self, timeout_ms=0):
+        """Read a reply from the relay, waiting at most timeout_ms (0 = poll)"""
+        if not self.device:
+            raise RuntimeError("Device not connected")
+            
+        try:
+            response = self.device.read(64, timeout_ms=timeout_ms)
+        except Exception:
+            return None  # Some commands don't return data
+        if response and self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug(f"Response: {[hex(x) for x in response]}")
+        return response
+    
     def set_relay(self, relay_num, state):
         """Set relay state"""
         if relay_num not in [1, 2]:
@@ -89,11 +110,24 @@ class HIDRelay:
             
         return self.send_command([cmd])
     
+    def set_relays(self, state_mask):
+        """Set both relays from a bit mask (bit 0 = relay 1, bit 1 = relay 2)
+        
+        All-on and all-off go out as a single broadcast report (0xFF / 0x00);
+        mixed states need one report per relay.
+        """
+        state_mask &= 0b11
+        if state_mask == 0b11:
+            return self.send_command([0xFF])
+        if state_mask == 0b00:
+            return self.send_command([0x00])
+        return (self.set_relay(1, bool(state_mask & 0b01)) and
+                self.set_relay(2, bool(state_mask & 0b10)))
+    
     def set_all_relays(self, state):
         """Set all relays to same state"""
         self.logger.info(f"Setting ALL relays {'ON' if state else 'OFF'}")
-        cmd = 0xFF if state else 0x00
-        return self.send_command([cmd])
+        return self.set_relays(0b11 if state else 0b00)
     
     def close(self):
         """Close the connection"""
@@ -107,10 +141,7 @@ class HIDRelay:
 def main():
     """Test the relay"""
     # Configure logging
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(message)s'
-    )
+    configure(fmt='%(message)s')
     
     logger = logging.getLogger(__name__)
     logger.info("=== NOYITO USB Relay Test ===")
@@ -6,11 +6,17 @@ For NOYITO USB relay on Mac M-series
 
 import hid
 import time
+import atexit
+import threading
 
 # USB Relay device identifiers
 VENDOR_ID = 0x16c0
 PRODUCT_ID = 0x05df
 
+# Relay handle opened on first use and shared by every control_relay call
+_device = None
+_device_lock = threading.Lock()
+
 def find_relay():
     """Find and open USB relay device"""
     print("Searching for USB relay...")
@@ -29,10 +35,41 @@ def find_relay():
         print(f"✗ Error finding device: {e}")
         return None
 
+def _get_device():
+    """Return the shared relay handle, opening it on first use"""
+    global _device
+    with _device_lock:
+        if _device is None:
+            _device = find_relay()
+        return _device
+
+def _discard_device(device):
+    """Close a failed handle so the next call opens the relay again"""
+    global _device
+    with _device_lock:
+        if _device is not device:
+            # Already dropped by another call
+            return
+        _device = None
+        try:
+            device.close()
+        except Exception:
+            pass
+
+@atexit.register
+def _close_device():
+    """Close the shared relay handle at interpreter exit"""
+    global _device
+    with _device_lock:
+        if _device is not None:
+            _device.close()
+            _device = None
+
 def control_relay(relay_num, state):
     """Control relay state"""
+    device = None
     try:
-        device = find_relay()
+        device = _get_device()
         if not device:
             return False
         
@@ -49,12 +86,13 @@ def control_relay(relay_num, state):
         response = device.read(8)
         print(f"Response: {[hex(x) for x in response]}")
         
-        device.close()
         print("✓ Command sent successfully")
         return True
         
     except Exception as e:
         print(f"✗ Error: {e}")
+        if device is not None:
+            _discard_device(device)
         return False
 
 def main():
@@ -10,16 +10,21 @@ import subprocess
 import logging
 import tempfile
 import shutil
+import getpass
+import shlex
 import requests
 from pathlib import Path
+from log_setup import configure
+from driver_verify import DRIVER_SHA256, verify_driver_zip
 
 # Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(message)s'
-)
+configure(fmt='%(message)s')
 logger = logging.getLogger(__name__)
 
+# Direct download URL for the Mac driver, and the local file name it is saved as
+DRIVER_URL = "https://www.wch.cn/downloads/file/178.html"
+DRIVER_ZIP = 'CH341SER_MAC.ZIP'
+
 def check_system():
     """Check if system is compatible"""
     logger.info("Checking system compatibility...")
@@ -38,18 +43,53 @@ def check_system():
     
     return True
 
+def download_driver():
+    """Download the driver zip, falling back to a manual download on failure"""
+    if os.path.exists(DRIVER_ZIP):
+        logger.info(f"\nChecking existing {DRIVER_ZIP}")
+        if verify_driver_zip(DRIVER_ZIP):
+            return os.path.abspath(DRIVER_ZIP)
+        return download_manual()
+    
+    if not DRIVER_SHA256:
+        logger.info("\nNo pinned driver checksum (CH340_DRIVER_SHA256), skipping automatic download")
+        return download_manual()
+    
+    logger.info("\nDownloading CH340 driver...")
+    partial_path = DRIVER_ZIP + '.part'
+    try:
+        # Stream straight to disk in 1 MiB chunks instead of holding the zip in memory
+        with requests.get(DRIVER_URL, stream=True, timeout=30) as response:
+            response.raise_for_status()
+            response.raw.decode_content = True
+            with open(partial_path, 'wb') as f:
+                shutil.copyfileobj(response.raw, f, length=1 << 20)
+        
+        # Only a verified zip takes the real file name
+        if not verify_driver_zip(partial_path):
+            os.remove(partial_path)
+            return download_manual()
+        os.replace(partial_path, DRIVER_ZIP)
+        logger.info("✓ Download complete")
+        return os.path.abspath(DRIVER_ZIP)
+    except (requests.RequestException, OSError) as e:
+        logger.error(f"Download failed: {e}")
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        return download_manual()
+
 def download_manual():
     """Provide manual download instructions"""
     logger.info("\nPlease download the driver manually:")
     logger.info("1. Visit: https://www.wch.cn/downloads/CH341SER_MAC_ZIP.html")
     logger.info("2. Click the download button")
-    logger.info("3. Save the file as 'CH341SER_MAC.ZIP'")
-    logger.info("4. Move the file to the current directory")
+    logger.info(f"3. Save the file as '{DRIVER_ZIP}'")
+    logger.info("4. Move the file to the current directory, replacing any existing copy")
     
-    while not os.path.exists('CH341SER_MAC.ZIP'):
+    while True:
         input("\nPress Enter after downloading the file...")
-    
-    return os.path.abspath('CH341SER_MAC.ZIP')
+        if os.path.exists(DRIVER_ZIP) and verify_driver_zip(DRIVER_ZIP):
+            return os.path.abspath(DRIVER_ZIP)
 
 def extract_driver(zip_path, temp_dir):
     """Extract driver package"""
@@ -75,27 +115,41 @@ def extract_driver(zip_path, temp_dir):
         raise
 
 def install_driver(pkg_path):
-    """Install driver package"""
+    """Install driver package and set up serial device permissions
+    
+    Everything that needs root runs as one sudo shell script, so the user
+    authenticates once instead of for each command.
+    """
     logger.info("\nInstalling driver...")
     logger.info("This will require administrator privileges")
     
-    try:
-        # First, unload any existing driver
-        subprocess.run(['sudo', 'kextunload', '-b', 'com.wch.ch34xseria'], 
-                      capture_output=True, check=False)
-        
+    user = getpass.getuser()
+    script = "\n".join([
+        "set -e",
+        # Unload any existing driver
+        "kextunload -b com.wch.ch34xseria || true",
         # Install new driver
-        cmd = ['sudo', 'installer', '-pkg', pkg_path, '-target', '/']
-        subprocess.run(cmd, check=True)
-        
+        f"installer -pkg {shlex.quote(pkg_path)} -target /",
         # Load the new driver
-        subprocess.run(['sudo', 'kextload', '-b', 'com.wch.ch34xseria'], 
-                      capture_output=True, check=False)
-        
+        "kextload -b com.wch.ch34xseria || true",
+        # Add user to dialout group (if it exists)
+        f"dseditgroup -o edit -a {shlex.quote(user)} -t user dialout || true",
+        # Set permissions on potential device nodes
+        "chmod 666 /dev/tty.* || true",
+    ])
+    
+    try:
+        result = subprocess.run(['sudo', 'sh', '-c', script],
+                                capture_output=True, text=True, check=True)
+        if result.stdout.strip():
+            logger.info(result.stdout.strip())
         logger.info("✓ Installation complete")
+        logger.info("✓ Permissions setup complete")
         return True
     except subprocess.CalledProcessError as e:
         logger.error(f"Installation failed: {e}")
+        if e.stderr:
+            logger.error(e.stderr.strip())
         return False
 
 def verify_installation():
@@ -109,11 +163,11 @@ def verify_installation():
             logger.info("✓ Driver loaded successfully")
             return True
         
-        # Check device nodes
-        devices = subprocess.check_output(['ls', '/dev/tty.*'], 
-                                       stderr=subprocess.DEVNULL).decode()
-        if any('wchusbserial' in dev.lower() for dev in devices.split()):
-            logger.info("✓ CH340 device nodes found")
+        # Check device nodes (no shell, so list /dev directly rather than globbing)
+        devices = [entry.name for entry in os.scandir('/dev')
+                   if entry.name.startswith('tty.') and 'wchusbserial' in entry.name.lower()]
+        if devices:
+            logger.info(f"✓ CH340 device nodes found: {', '.join(devices)}")
             return True
         
         logger.warning("! Driver installed but not loaded")
@@ -123,27 +177,6 @@ def verify_installation():
         logger.error(f"Verification failed: {e}")
         return False
 
-def setup_permissions():
-    """Setup correct permissions for serial device"""
-    logger.info("\nSetting up permissions...")
-    
-    try:
-        # Get current user
-        user = subprocess.check_output(['whoami']).decode().strip()
-        
-        # Add user to dialout group (if it exists)
-        subprocess.run(['sudo', 'dseditgroup', '-o', 'edit', '-a', user, '-t', 'user', 'dialout'], 
-                      check=False)
-        
-        # Set permissions on potential device nodes
-        subprocess.run(['sudo', 'chmod', '666', '/dev/tty.*'], check=False)
-        
-        logger.info("✓ Permissions setup complete")
-        return True
-    except Exception as e:
-        logger.error(f"Permission setup failed: {e}")
-        return False
-
 def main():
     """Main installation routine"""
     logger.info("=== CH340 Driver Installation ===")
@@ -153,20 +186,17 @@ def main():
         check_system()
         
         # Get driver file
-        zip_path = download_manual()
+        zip_path = download_driver()
         
         # Create temporary directory
         with tempfile.TemporaryDirectory() as temp_dir:
             # Extract package
             pkg_path = extract_driver(zip_path, temp_dir)
             
-            # Install driver
+            # Install driver and set up permissions
             if not install_driver(pkg_path):
                 raise RuntimeError("Driver installation failed")
             
-            # Setup permissions
-            setup_permissions()
-            
             # Verify installation
             verify_installation()
         
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Shared logging setup
+
+Log records are put on a queue by the calling thread and written out by a
+background QueueListener, so relay and monitoring code never waits on the
+console or the log file.
+"""
+
+import sys
+import queue
+import atexit
+import logging
+import logging.handlers
+
+DEFAULT_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+_listener = None
+
+def configure(level=logging.INFO, fmt=DEFAULT_FORMAT, log_file=None, stream=None):
+    """Configure root logging once; later calls are no-ops"""
+    global _listener
+    if _listener is not None:
+        return
+
+    formatter = logging.Formatter(fmt)
+    handlers = [logging.StreamHandler(stream or sys.stderr)]
+    if log_file:
+        handlers.append(logging.FileHandler(log_file))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.Queue(-1)
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    # Flush anything still queued on exit
+    atexit.register(_listener.stop)
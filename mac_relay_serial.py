@@ -4,43 +4,77 @@ NOYITO USB Relay Controller for Mac
 Using CH340 Serial Protocol
 """
 
+import os
 import time
+import atexit
+import logging
 import serial
 import serial.tools.list_ports
 
+logger = logging.getLogger(__name__)
+
 # CH340 USB-Serial converter identifiers
 VENDOR_ID = '1a86'   # QinHeng Electronics
 PRODUCT_ID = '7523'  # CH340 converter
 
-# Command sequences
+# Command sequences, keyed by (relay number, state)
 COMMANDS = {
-    'relay1_on':  [0xA0, 0x01, 0x01, 0xA2],
-    'relay1_off': [0xA0, 0x01, 0x00, 0xA1],
-    'relay2_on':  [0xA0, 0x02, 0x01, 0xA3],
-    'relay2_off': [0xA0, 0x02, 0x00, 0xA2]
+    (1, True):  bytes([0xA0, 0x01, 0x01, 0xA2]),
+    (1, False): bytes([0xA0, 0x01, 0x00, 0xA1]),
+    (2, True):  bytes([0xA0, 0x02, 0x01, 0xA3]),
+    (2, False): bytes([0xA0, 0x02, 0x00, 0xA2])
 }
 
+# Discovered port and its open Serial handle, reused across control_relay calls
+_CACHED_PORT = None
+_CACHED_SER = None
+
 def find_ch340_device():
     """Find CH340 device port"""
+    global _CACHED_PORT
+    
+    # Port enumeration is slow on macOS; reuse the last port while it exists
+    if _CACHED_PORT and os.path.exists(_CACHED_PORT):
+        return _CACHED_PORT
+    
     print("Searching for CH340 device...")
     
-    ports = list(serial.tools.list_ports.comports())
-    device_port = None
+    # Print all port information for debugging
+    if os.environ.get('RELAY_DEBUG'):
+        for p in serial.tools.list_ports.comports():
+            print(f"\nPort: {p.device}")
+            print(f"Description: {p.description}")
+            print(f"Hardware ID: {p.hwid}")
     
-    for p in ports:
-        # Print all port information for debugging
-        print(f"\nPort: {p.device}")
-        print(f"Description: {p.description}")
-        print(f"Hardware ID: {p.hwid}")
-        
-        # Check if this is our CH340 device
-        if f"{VENDOR_ID}:{PRODUCT_ID}" in p.hwid.lower():
-            print(f"\n✓ Found CH340 device at {p.device}")
-            device_port = p.device
-            break
+    # Let pyserial filter on the CH340 VID:PID in the hardware ID
+    port = next(serial.tools.list_ports.grep(f"{VENDOR_ID}:{PRODUCT_ID}"), None)
+    device_port = port.device if port else None
+    if device_port:
+        print(f"\n✓ Found CH340 device at {device_port}")
             
+    _CACHED_PORT = device_port
     return device_port
 
+def get_serial(port):
+    """Return an open Serial handle for port, reusing the cached one"""
+    global _CACHED_SER
+    
+    if _CACHED_SER is not None and _CACHED_SER.is_open and _CACHED_SER.port == port:
+        return _CACHED_SER
+    close_serial()
+    print(f"\nOpening {port}...")
+    _CACHED_SER = serial.Serial(port, 9600, timeout=1)
+    return _CACHED_SER
+
+@atexit.register
+def close_serial():
+    """Close the cached Serial handle"""
+    global _CACHED_SER
+    
+    if _CACHED_SER is not None:
+        _CACHED_SER.close()
+        _CACHED_SER = None
+
 def control_relay(relay_num=1, state=True, duration=None):
     """Control relay state"""
     # Find device
@@ -50,16 +84,15 @@ def control_relay(relay_num=1, state=True, duration=None):
         return False
     
     try:
-        # Open serial connection
-        print(f"\nOpening {port}...")
-        ser = serial.Serial(port, 9600, timeout=1)
+        # Open (or reuse) serial connection
+        ser = get_serial(port)
         
         # Determine command
-        cmd_key = f"relay{relay_num}_{'on' if state else 'off'}"
-        command = COMMANDS[cmd_key]
+        command = COMMANDS[(relay_num, bool(state))]
         
         # Send command
-        print(f"Sending command: {[hex(x) for x in command]}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Sending command: {[hex(x) for x in command]}")
         ser.write(command)
         
         # Wait if duration specified
@@ -68,18 +101,17 @@ def control_relay(relay_num=1, state=True, duration=None):
             time.sleep(duration)
             
             # Send opposite command
-            cmd_key = f"relay{relay_num}_{'off' if state else 'on'}"
-            command = COMMANDS[cmd_key]
-            print(f"Sending command: {[hex(x) for x in command]}")
+            command = COMMANDS[(relay_num, not state)]
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"Sending command: {[hex(x) for x in command]}")
             ser.write(command)
         
-        # Close connection
-        ser.close()
         print("✓ Command(s) sent successfully")
         return True
         
     except Exception as e:
         print(f"✗ Error: {e}")
+        close_serial()  # Reopen on the next call
         return False
 
 def main():
@@ -1,13 +1,7 @@
 import logging
 import sys
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('battery_monitor.log'),
-        logging.StreamHandler(sys.stdout)
-    ]
-)
+from log_setup import configure
+configure(log_file='battery_monitor.log', stream=sys.stdout)
 
 import json
 import time
@@ -4,13 +4,42 @@ NOYITO USB Relay Controller
 
 Main controller class for NOYITO 2-channel USB relay.
 Uses serial protocol for M-series Mac compatibility.
+
+The controller is asyncio-based: blocking serial I/O runs in the default
+executor and delays use asyncio.sleep, so other tasks keep running while
+a relay change is being verified.
 """
 
+import asyncio
+import functools
 import json
 import logging
-import time
+from dataclasses import dataclass, fields
 from typing import Dict, Optional, Tuple
 from serial_protocol import RelayProtocol
+from log_setup import configure
+
+# Delay before the optional verification query after a relay command
+VERIFY_DELAY = 0.02
+
+_ON = 'ON'
+_OFF = 'OFF'
+
+def _states_text(states) -> str:
+    """Format relay states for logging"""
+    return f"Relay1={_ON if states[0] else _OFF}, Relay2={_ON if states[1] else _OFF}"
+
+@dataclass
+class RelayConfig:
+    """Relay settings from config.json"""
+    relay_baud_rate: int = 9600
+    
+    @classmethod
+    def from_file(cls, config_file: str) -> 'RelayConfig':
+        """Load the relay settings, ignoring unrelated keys"""
+        with open(config_file, 'r') as f:
+            data = json.load(f)
+        return cls(**{field.name: data[field.name] for field in fields(cls) if field.name in data})
 
 class RelayController:
     """Controller for NOYITO USB Relay"""
@@ -21,8 +50,7 @@ class RelayController:
         
         # Load config
         try:
-            with open(config_file, 'r') as f:
-                self.config = json.load(f)
+            self.config = RelayConfig.from_file(config_file)
         except Exception as e:
             self.logger.error(f"Failed to load config: {e}")
             raise
@@ -30,45 +58,63 @@ class RelayController:
         self.protocol = None
         self.connected = False
         self.relay_states = [False, False]  # State of relay 1 and 2
+        
+        # Pulsed whenever a relay change is confirmed; await relay_changed.wait()
+        # to react to state transitions instead of polling
+        self.relay_changed = asyncio.Event()
+    
+    async def _call(self, func, *args, **kwargs):
+        """Run a blocking protocol call without blocking the event loop"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, functools.partial(func, *args, **kwargs))
+    
+    def _notify_changed(self):
+        """Wake every task currently waiting on relay_changed"""
+        self.relay_changed.set()
+        self.relay_changed.clear()
     
-    def connect(self) -> bool:
+    async def connect(self) -> bool:
         """Connect to the relay device"""
         try:
             # Initialize protocol handler
-            self.protocol = RelayProtocol(
-                baud_rate=self.config.get('relay_baud_rate', 9600)
+            self.protocol = await self._call(
+                RelayProtocol,
+                baud_rate=self.config.relay_baud_rate
             )
             
             # Test connection by querying status
-            self.relay_states = list(self.protocol.query_status())
+            self.relay_states = list(await self._call(self.protocol.query_status))
             self.connected = True
             self.logger.info("✓ Successfully connected to relay")
-            self.logger.info(f"Current states: Relay1={'ON' if self.relay_states[0] else 'OFF'}, Relay2={'ON' if self.relay_states[1] else 'OFF'}")
+            self.logger.info(f"Current states: {_states_text(self.relay_states)}")
             return True
             
         except Exception as e:
             self.logger.error(f"Connection failed: {e}")
-            import traceback
-            self.logger.debug(f"Traceback: {traceback.format_exc()}")
+            self.logger.debug("Traceback:", exc_info=True)
             return False
     
-    def get_relay_states(self) -> Tuple[bool, bool]:
+    async def get_relay_states(self) -> Tuple[bool, bool]:
         """Query current relay states"""
         if not self.connected:
             self.logger.error("Not connected to relay")
             return tuple(self.relay_states)
             
         try:
-            self.relay_states = list(self.protocol.query_status())
-            self.logger.debug(f"Current states: Relay1={'ON' if self.relay_states[0] else 'OFF'}, Relay2={'ON' if self.relay_states[1] else 'OFF'}")
+            self.relay_states = list(await self._call(self.protocol.query_status))
+            self.logger.debug(f"Current states: {_states_text(self.relay_states)}")
             return tuple(self.relay_states)
             
         except Exception as e:
             self.logger.error(f"Error reading relay states: {e}")
             return tuple(self.relay_states)
     
-    def set_relay(self, relay_num: int, state: bool) -> bool:
-        """Set state of a specific relay"""
+    async def set_relay(self, relay_num: int, state: bool, verify: bool = False) -> bool:
+        """Set state of a specific relay
+        
+        The cached state is updated from the command itself; pass verify=True
+        to confirm it with a status query.
+        """
         if not self.connected:
             self.logger.error("Not connected to relay")
             return False
@@ -77,28 +123,29 @@ class RelayController:
             self.logger.error("Invalid relay number. Must be 1 or 2")
             return False
             
-        self.logger.info(f"\nSetting Relay {relay_num} {'ON' if state else 'OFF'}")
+        self.logger.info(f"\nSetting Relay {relay_num} {_ON if state else _OFF}")
         
         try:
-            # Get current states first
-            current_states = self.get_relay_states()
-            self.logger.info(f"Current states before change: Relay1={'ON' if current_states[0] else 'OFF'}, Relay2={'ON' if current_states[1] else 'OFF'}")
-            
             # Send command
-            if self.protocol.set_relay(relay_num, state):
+            if await self._call(self.protocol.set_relay, relay_num, state):
                 # Update cached state
                 self.relay_states[relay_num - 1] = state
+                if not verify:
+                    self.logger.info(f"✓ Relay {relay_num} {_ON if state else _OFF}")
+                    self._notify_changed()
+                    return True
                 
                 # Verify state
-                time.sleep(0.1)
-                actual_states = self.get_relay_states()
+                await asyncio.sleep(VERIFY_DELAY)
+                actual_states = await self.get_relay_states()
                 if actual_states[relay_num - 1] == state:
-                    self.logger.info(f"✓ Relay {relay_num} {'ON' if state else 'OFF'}")
+                    self.logger.info(f"✓ Relay {relay_num} {_ON if state else _OFF}")
+                    self._notify_changed()
                     return True
                 else:
                     self.logger.error(f"✗ Relay {relay_num} state verification failed!")
-                    self.logger.info(f"  Expected: {'ON' if state else 'OFF'}")
-                    self.logger.info(f"  Actual: Relay1={'ON' if actual_states[0] else 'OFF'}, Relay2={'ON' if actual_states[1] else 'OFF'}")
+                    self.logger.info(f"  Expected: {_ON if state else _OFF}")
+                    self.logger.info(f"  Actual: {_states_text(actual_states)}")
                     return False
             else:
                 self.logger.error("✗ Failed to send command!")
@@ -106,53 +153,71 @@ class RelayController:
                 
         except Exception as e:
             self.logger.error(f"Error setting relay: {e}")
-            import traceback
-            self.logger.debug(f"Traceback: {traceback.format_exc()}")
+            self.logger.debug("Traceback:", exc_info=True)
+            await self.get_relay_states()  # Resync the cached states
             return False
     
-    def set_all_relays(self, state: bool) -> bool:
-        """Set state of all relays"""
+    async def set_state_mask(self, mask: int, verify: bool = False) -> bool:
+        """Set both relays from a bit mask (bit 0 = relay 1, bit 1 = relay 2)
+        
+        Both channels go out in one write; with verify=True a single status
+        query confirms them.
+        """
         if not self.connected:
             self.logger.error("Not connected to relay")
             return False
             
-        self.logger.info(f"\n=== Setting ALL Relays {'ON' if state else 'OFF'} ===")
+        expected = (bool(mask & 0b01), bool(mask & 0b10))
         
-        success = True
-        for relay in [1, 2]:
-            if not self.set_relay(relay, state):
-                success = False
-                break
-            time.sleep(0.1)  # Small delay between relay commands
+        try:
+            if not await self._call(self.protocol.set_state_mask, mask):
+                self.logger.error("✗ Failed to send command!")
+                return False
+            self.relay_states = list(expected)
+            if not verify:
+                self.logger.info(f"✓ {_states_text(expected)}")
+                self._notify_changed()
+                return True
             
-        return success
+            await asyncio.sleep(VERIFY_DELAY)
+            actual_states = await self.get_relay_states()
+            if actual_states == expected:
+                self.logger.info(f"✓ {_states_text(expected)}")
+                self._notify_changed()
+                return True
+            else:
+                self.logger.error("✗ Relay state verification failed!")
+                self.logger.info(f"  Expected: {_states_text(expected)}")
+                self.logger.info(f"  Actual: {_states_text(actual_states)}")
+                return False
+                
+        except Exception as e:
+            self.logger.error(f"Error setting relays: {e}")
+            self.logger.debug("Traceback:", exc_info=True)
+            await self.get_relay_states()  # Resync the cached states
+            return False
     
-    def cleanup(self):
+    async def set_all_relays(self, state: bool, verify: bool = False) -> bool:
+        """Set state of all relays, optionally confirming with a status query"""
+        self.logger.info(f"\n=== Setting ALL Relays {_ON if state else _OFF} ===")
+        return await self.set_state_mask(0b11 if state else 0b00, verify=verify)
+    
+    async def cleanup(self):
         """Safe cleanup of relay connection"""
         if self.connected:
             try:
                 self.logger.info("\nCleaning up...")
                 # Turn all relays off
-                for relay in [1, 2]:
-                    self.set_relay(relay, False)
-                    time.sleep(0.1)
+                await self.set_all_relays(False)
                 if self.protocol:
-                    self.protocol.close()
+                    await self._call(self.protocol.close)
                 self.logger.info("✓ Relay connection closed")
             except Exception as e:
                 self.logger.error(f"Cleanup error: {e}")
-                import traceback
-                self.logger.debug(f"Traceback: {traceback.format_exc()}")
+                self.logger.debug("Traceback:", exc_info=True)
 
-def main():
-    """Test the relay controller"""
-    # Configure logging
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(levelname)s - %(message)s',
-        handlers=[logging.StreamHandler()]
-    )
-    
+async def run_test_sequence():
+    """Run the relay test sequence"""
     logger = logging.getLogger(__name__)
     logger.info("=== NOYITO USB Relay Test ===")
     
@@ -161,7 +226,7 @@ def main():
         controller = RelayController()
         
         # Connect to relay
-        if not controller.connect():
+        if not await controller.connect():
             logger.error("Failed to connect to relay!")
             return
         
@@ -172,22 +237,22 @@ def main():
         logger.info("\nTesting individual relays...")
         
         # Relay 1
-        controller.set_relay(1, True)   # ON
-        time.sleep(1)
-        controller.set_relay(1, False)  # OFF
-        time.sleep(1)
+        await controller.set_relay(1, True, verify=True)   # ON
+        await asyncio.sleep(1)
+        await controller.set_relay(1, False, verify=True)  # OFF
+        await asyncio.sleep(1)
         
         # Relay 2
-        controller.set_relay(2, True)   # ON
-        time.sleep(1)
-        controller.set_relay(2, False)  # OFF
-        time.sleep(1)
+        await controller.set_relay(2, True, verify=True)   # ON
+        await asyncio.sleep(1)
+        await controller.set_relay(2, False, verify=True)  # OFF
+        await asyncio.sleep(1)
         
         # Test both relays
         logger.info("\nTesting both relays...")
-        controller.set_all_relays(True)   # All ON
-        time.sleep(1)
-        controller.set_all_relays(False)  # All OFF
+        await controller.set_all_relays(True, verify=True)   # All ON
+        await asyncio.sleep(1)
+        await controller.set_all_relays(False, verify=True)  # All OFF
         
         logger.info("\nTest sequence complete!")
         
@@ -195,13 +260,22 @@ def main():
         logger.info("\nTest interrupted by user")
     except Exception as e:
         logger.error(f"Test error: {e}")
-        import traceback
-        logger.debug(f"Traceback: {traceback.format_exc()}")
+        logger.debug("Traceback:", exc_info=True)
     finally:
         # Cleanup
         logger.info("\nCleaning up...")
         if 'controller' in locals():
-            controller.cleanup()
+            await controller.cleanup()
+
+def main():
+    """Test the relay controller"""
+    # Configure logging
+    configure()
+    
+    try:
+        asyncio.run(run_test_sequence())
+    except KeyboardInterrupt:
+        logging.getLogger(__name__).info("\nTest interrupted by user")
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
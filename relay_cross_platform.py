@@ -1,13 +1,15 @@
 #!/usr/bin/env python3
 """
 Cross-Platform USB Relay Control
-Supports both Windows and Mac implementations
+Uses hidapi on both Windows and Mac
 """
 
 import sys
-import time
+import asyncio
 import logging
+from types import MappingProxyType
 from abc import ABC, abstractmethod
+from console_input import ConsoleReader
 
 # Configure logging
 logging.basicConfig(
@@ -20,12 +22,21 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-class RelayCommands:
-    """Unified command structure for both platforms"""
-    RELAY1_ON =  {'windows': b'\x00\x00\x01', 'darwin': [0x0, 0xFF, 0x01]}
-    RELAY1_OFF = {'windows': b'\x00\x00\x00', 'darwin': [0x0, 0xFD, 0x01]}
-    RELAY2_ON =  {'windows': b'\x00\x01\x01', 'darwin': [0x0, 0xFF, 0x02]}
-    RELAY2_OFF = {'windows': b'\x00\x01\x00', 'darwin': [0x0, 0xFD, 0x02]}
+STATUS_TIMEOUT_MS = 50
+
+# Command reports, built once at import and padded to the full 8-byte HID report
+def _pad_report(cmd):
+    return bytes(cmd + [0x0] * (8 - len(cmd)))
+
+_HID_CMD = MappingProxyType({
+    'RELAY1_ON':  _pad_report([0x0, 0xFF, 0x01]),
+    'RELAY1_OFF': _pad_report([0x0, 0xFD, 0x01]),
+    'RELAY2_ON':  _pad_report([0x0, 0xFF, 0x02]),
+    'RELAY2_OFF': _pad_report([0x0, 0xFD, 0x02]),
+    # Both relays in one report, instead of one write per relay
+    'ALL_ON':     _pad_report([0x0, 0xFE]),
+    'ALL_OFF':    _pad_report([0x0, 0xFC]),
+})
 
 class RelayImplementation(ABC):
     """Abstract base class for relay implementations"""
@@ -50,42 +61,40 @@ class RelayImplementation(ABC):
         """Get relay status"""
         pass
 
-class WindowsRelayImplementation(RelayImplementation):
-    """Windows-specific implementation"""
+class HidRelayImplementation(RelayImplementation):
+    """hidapi implementation, used on both Windows and Mac"""
     
     def __init__(self):
         self.device = None
-        self.platform = 'windows'
+        self.platform = sys.platform
         
     def connect(self):
         try:
-            # Windows implementation using pyusb or similar
-            import usb.core
-            import usb.util
+            import hid
+            
+            # Find and open device
+            self.device = hid.device()
+            self.device.open(0x16c0, 0x05df)
+            self.device.set_nonblocking(1)
             
-            # Find device
-            self.device = usb.core.find(idVendor=0x16c0, idProduct=0x05df)
-            if self.device is None:
-                raise RuntimeError("Device not found")
-                
-            # Set configuration
-            self.device.set_configuration()
+            logger.info(f"Connected to relay device on {self.platform}")
+            logger.info(f"Manufacturer: {self.device.get_manufacturer_string()}")
+            logger.info(f"Product: {self.device.get_product_string()}")
             
-            logger.info("Connected to relay device on Windows")
             return True
             
         except Exception as e:
-            logger.error(f"Windows connection error: {e}")
+            logger.error(f"HID connection error: {e}")
             return False
     
     def disconnect(self):
         try:
             if self.device:
-                usb.util.dispose_resources(self.device)
+                self.device.close()
             logger.info("Disconnected from relay device")
             return True
         except Exception as e:
-            logger.error(f"Windows disconnection error: {e}")
+            logger.error(f"HID disconnection error: {e}")
             return False
     
     def send_command(self, command):
@@ -93,16 +102,15 @@ class WindowsRelayImplementation(RelayImplementation):
             if not self.device:
                 raise RuntimeError("Device not connected")
             
-            # Get command bytes for Windows
-            cmd_bytes = RelayCommands.__dict__[command]['windows']
-            
             # Send command
-            self.device.ctrl_transfer(0x21, 0x09, 0x0300, 0x0000, cmd_bytes)
-            logger.info(f"Sent command: {command}")
+            self.device.write(_HID_CMD[command])
+            logger.info("Sent command: %s", command)
+            
+            # State changes are fire-and-forget; only get_status reads a reply
             return True
             
         except Exception as e:
-            logger.error(f"Windows command error: {e}")
+            logger.error(f"HID command error: {e}")
             return False
     
     def get_status(self):
@@ -110,82 +118,79 @@ class WindowsRelayImplementation(RelayImplementation):
             if not self.device:
                 raise RuntimeError("Device not connected")
             
-            # Read status
-            status = self.device.ctrl_transfer(0xA1, 0x01, 0x0300, 0x0000, 8)
-            return {'relay1': bool(status[0] & 1), 'relay2': bool(status[0] & 2)}
+            # Send status query, waiting at most STATUS_TIMEOUT_MS for the reply
+            self.device.write([0x0] * 8)
+            response = self.device.read(8, STATUS_TIMEOUT_MS)
+            if not response:
+                raise RuntimeError("No response to status query")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Response: %s", bytes(response).hex())
+            
+            return {
+                'relay1': bool(response[0] & 1),
+                'relay2': bool(response[0] & 2)
+            }
             
         except Exception as e:
-            logger.error(f"Windows status error: {e}")
+            logger.error(f"HID status error: {e}")
             return None
 
-class MacRelayImplementation(RelayImplementation):
-    """Mac-specific implementation"""
+class WorkerRelayImplementation(RelayImplementation):
+    """HID implementation that does all device I/O in a worker process"""
     
     def __init__(self):
-        self.device = None
-        self.platform = 'darwin'
+        self.worker = None
+        self.platform = sys.platform
         
     def connect(self):
         try:
-            import hid
+            from relay_io_worker import RelayIOWorker
             
-            # Find and open device
-            self.device = hid.device()
-            self.device.open(0x16c0, 0x05df)
+            self.worker = RelayIOWorker(0x16c0, 0x05df)
+            self.worker.start()
             
-            logger.info(f"Connected to relay device on Mac")
-            logger.info(f"Manufacturer: {self.device.get_manufacturer_string()}")
-            logger.info(f"Product: {self.device.get_product_string()}")
+            logger.info("Connected to relay device via worker process")
+            logger.info(f"Manufacturer: {self.worker.manufacturer}")
+            logger.info(f"Product: {self.worker.product}")
             
             return True
             
         except Exception as e:
-            logger.error(f"Mac connection error: {e}")
+            self.worker = None
+            logger.error(f"Worker connection error: {e}")
             return False
     
     def disconnect(self):
         try:
-            if self.device:
-                self.device.close()
+            if self.worker:
+                self.worker.stop()
             logger.info("Disconnected from relay device")
             return True
         except Exception as e:
-            logger.error(f"Mac disconnection error: {e}")
+            logger.error(f"Worker disconnection error: {e}")
             return False
     
     def send_command(self, command):
         try:
-            if not self.device:
+            if not self.worker:
                 raise RuntimeError("Device not connected")
             
-            # Get command for Mac
-            cmd = RelayCommands.__dict__[command]['darwin']
-            
-            # Pad command to 8 bytes
-            full_command = cmd + [0x0] * (8 - len(cmd))
-            
-            # Send command
-            self.device.write(full_command)
-            logger.info(f"Sent command: {command}")
-            
-            # Read response
-            response = self.device.read(8)
-            logger.info(f"Response: {[hex(x) for x in response]}")
-            
+            self.worker.write(_HID_CMD[command])
+            logger.info("Sent command: %s", command)
             return True
             
         except Exception as e:
-            logger.error(f"Mac command error: {e}")
+            logger.error(f"Worker command error: {e}")
             return False
     
     def get_status(self):
         try:
-            if not self.device:
+            if not self.worker:
                 raise RuntimeError("Device not connected")
             
-            # Send status query
-            self.device.write([0x0] * 8)
-            response = self.device.read(8)
+            response = self.worker.query([0x0] * 8)
+            if not response:
+                raise RuntimeError("No response to status query")
             
             return {
                 'relay1': bool(response[0] & 1),
@@ -193,23 +198,32 @@ class MacRelayImplementation(RelayImplementation):
             }
             
         except Exception as e:
-            logger.error(f"Mac status error: {e}")
+            logger.error(f"Worker status error: {e}")
             return None
 
+# Command names indexed as _CMDS[relay_num - 1][state]
+_CMDS = (('RELAY1_OFF', 'RELAY1_ON'), ('RELAY2_OFF', 'RELAY2_ON'))
+
 class RelayController:
     """Main relay control interface"""
     
-    def __init__(self):
+    def __init__(self, use_worker=None):
         self.platform = sys.platform
+        # hidapi writes stall on the macOS main RunLoop, so there the device
+        # is driven from a worker process unless the caller says otherwise
+        if use_worker is None:
+            use_worker = self.platform == 'darwin'
+        self.use_worker = use_worker
         self.implementation = self._get_implementation()
+        self._send = self.implementation.send_command
         self.connected = False
     
     def _get_implementation(self):
         """Get platform-specific implementation"""
-        if self.platform == 'darwin':
-            return MacRelayImplementation()
-        elif self.platform == 'win32':
-            return WindowsRelayImplementation()
+        if self.use_worker:
+            return WorkerRelayImplementation()
+        if self.platform in ('darwin', 'win32'):
+            return HidRelayImplementation()
         else:
             raise NotImplementedError(f"Platform {self.platform} not supported")
     
@@ -230,8 +244,17 @@ class RelayController:
             if not self.connect():
                 return False
         
-        command = f"RELAY{relay_num}_{'ON' if state else 'OFF'}"
-        return self.implementation.send_command(command)
+        if relay_num not in (1, 2):
+            logger.error(f"Invalid relay number: {relay_num}")
+            return False
+        return self._send(_CMDS[relay_num - 1][bool(state)])
+    
+    def set_all(self, state):
+        """Set both relays with a single write"""
+        if not self.connected:
+            if not self.connect():
+                return False
+        return self._send('ALL_ON' if state else 'ALL_OFF')
     
     def get_status(self):
         """Get relay status"""
@@ -241,54 +264,97 @@ class RelayController:
         
         return self.implementation.get_status()
 
-def main():
+class AsyncRelayController:
+    """RelayController wrapper that runs device I/O off the event loop"""
+    
+    def __init__(self, controller=None):
+        self.controller = controller or RelayController()
+    
+    async def _call(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, func, *args)
+    
+    async def connect(self):
+        """Connect to relay device"""
+        return await self._call(self.controller.connect)
+    
+    async def disconnect(self):
+        """Disconnect from relay device"""
+        return await self._call(self.controller.disconnect)
+    
+    async def control_relay(self, relay_num, state):
+        """Control relay state"""
+        return await self._call(self.controller.control_relay, relay_num, state)
+    
+    async def set_all(self, state):
+        """Set both relays with a single write"""
+        return await self._call(self.controller.set_all, state)
+    
+    async def get_status(self):
+        """Get relay status"""
+        return await self._call(self.controller.get_status)
+    
+    async def pulse(self, relay_num, duration=1):
+        """Turn a relay on, then off again after duration seconds"""
+        await self.control_relay(relay_num, True)
+        await asyncio.sleep(duration)
+        await self.control_relay(relay_num, False)
+
+async def run_interactive():
     """Interactive test routine"""
     print("=== Cross-Platform USB Relay Control ===")
     
-    controller = RelayController()
+    controller = AsyncRelayController()
     
-    if not controller.connect():
+    if not await controller.connect():
         print("Failed to connect to relay device")
         return
     
-    while True:
-        print("\nCommands:")
-        print("1: Toggle Relay 1")
-        print("2: Toggle Relay 2")
-        print("3: Turn Relay 1 ON")
-        print("4: Turn Relay 1 OFF")
-        print("5: Turn Relay 2 ON")
-        print("6: Turn Relay 2 OFF")
-        print("s: Get Status")
-        print("q: Quit")
+    console = ConsoleReader()
+    try:
+        while True:
+            print("\nCommands:")
+            print("1: Toggle Relay 1")
+            print("2: Toggle Relay 2")
+            print("3: Turn Relay 1 ON")
+            print("4: Turn Relay 1 OFF")
+            print("5: Turn Relay 2 ON")
+            print("6: Turn Relay 2 OFF")
+            print("s: Get Status")
+            print("q: Quit")
         
-        cmd = input("\nEnter command (1-6/s/q): ").lower()
+            cmd = (await console.input("\nEnter command (1-6/s/q): ")).lower()
         
-        if cmd == 'q':
-            break
-        elif cmd == 's':
-            status = controller.get_status()
-            if status:
-                print(f"Relay 1: {'ON' if status['relay1'] else 'OFF'}")
-                print(f"Relay 2: {'ON' if status['relay2'] else 'OFF'}")
-        elif cmd == '1':
-            controller.control_relay(1, True)
-            time.sleep(1)
-            controller.control_relay(1, False)
-        elif cmd == '2':
-            controller.control_relay(2, True)
-            time.sleep(1)
-            controller.control_relay(2, False)
-        elif cmd == '3':
-            controller.control_relay(1, True)
-        elif cmd == '4':
-            controller.control_relay(1, False)
-        elif cmd == '5':
-            controller.control_relay(2, True)
-        elif cmd == '6':
-            controller.control_relay(2, False)
-    
-    controller.disconnect()
+            if cmd == 'q':
+                break
+            elif cmd == 's':
+                status = await controller.get_status()
+                if status:
+                    print(f"Relay 1: {'ON' if status['relay1'] else 'OFF'}")
+                    print(f"Relay 2: {'ON' if status['relay2'] else 'OFF'}")
+            elif cmd == '1':
+                await controller.pulse(1)
+            elif cmd == '2':
+                await controller.pulse(2)
+            elif cmd == '3':
+                await controller.control_relay(1, True)
+            elif cmd == '4':
+                await controller.control_relay(1, False)
+            elif cmd == '5':
+                await controller.control_relay(2, True)
+            elif cmd == '6':
+                await controller.control_relay(2, False)
+    except (EOFError, asyncio.CancelledError):
+        # End of input, or Ctrl-C arriving as a cancellation under asyncio.run
+        pass
+    finally:
+        # Leave both relays off, as the 'q' path always has
+        await controller.set_all(False)
+        await controller.disconnect()
+
+def main():
+    """Interactive test routine"""
+    asyncio.run(run_interactive())
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
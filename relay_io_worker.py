@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+HID relay I/O worker process
+
+One child process owns the HID device; callers only touch a pair of
+multiprocessing queues. This keeps hidapi's write latency spikes on macOS
+off the caller's thread and event loop.
+"""
+
+import os
+import time
+import queue
+import logging
+import multiprocessing
+
+logger = logging.getLogger(__name__)
+
+VENDOR_ID = 0x16c0
+PRODUCT_ID = 0x05df
+
+REPORT_SIZE = 8
+READ_TIMEOUT_MS = 50
+START_TIMEOUT = 5.0
+REPLY_TIMEOUT = 0.1
+
+def _pin_to_cpu():
+    """Keep the worker on a single CPU where the OS supports it"""
+    if hasattr(os, 'sched_setaffinity'):
+        try:
+            cpus = sorted(os.sched_getaffinity(0))
+            os.sched_setaffinity(0, {cpus[-1]})
+        except OSError as e:
+            logger.debug(f"Could not set CPU affinity: {e}")
+
+def run(in_q, out_q, vendor_id=VENDOR_ID, product_id=PRODUCT_ID):
+    """Worker entry point: open the device once and serve requests until None"""
+    _pin_to_cpu()
+    try:
+        import hid
+        device = hid.device()
+        device.open(vendor_id, product_id)
+    except Exception as e:
+        out_q.put(('error', str(e)))
+        return
+
+    out_q.put(('ok', (device.get_manufacturer_string(), device.get_product_string())))
+    try:
+        while True:
+            request = in_q.get()
+            if request is None:
+                break
+            seq, op, report = request
+            try:
+                device.write(report)
+                if op == 'query':
+                    out_q.put((seq, 'ok', bytes(device.read(REPORT_SIZE, READ_TIMEOUT_MS))))
+                else:
+                    out_q.put((seq, 'ok', None))
+            except Exception as e:
+                out_q.put((seq, 'error', str(e)))
+    finally:
+        device.close()
+
+class RelayIOWorker:
+    """Client side of the worker process"""
+
+    def __init__(self, vendor_id=VENDOR_ID, product_id=PRODUCT_ID):
+        self.vendor_id = vendor_id
+        self.product_id = product_id
+        self.process = None
+        self.in_q = None
+        self.out_q = None
+        self._seq = 0
+        self.manufacturer = None
+        self.product = None
+
+    def start(self):
+        """Spawn the worker and wait for it to open the device"""
+        self.in_q = multiprocessing.Queue()
+        self.out_q = multiprocessing.Queue()
+        self.process = multiprocessing.Process(
+            target=run,
+            args=(self.in_q, self.out_q, self.vendor_id, self.product_id),
+            daemon=True
+        )
+        self.process.start()
+        try:
+            status, result = self.out_q.get(timeout=START_TIMEOUT)
+        except queue.Empty:
+            status, result = 'error', "worker did not start"
+        if status != 'ok':
+            self.stop()
+            raise RuntimeError(f"Relay worker failed: {result}")
+        self.manufacturer, self.product = result
+
+    def _request(self, op, report, timeout):
+        if self.process is None:
+            raise RuntimeError("Relay worker not running")
+        self._seq += 1
+        self.in_q.put((self._seq, op, report))
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                seq, status, result = self.out_q.get(timeout=max(0, deadline - time.monotonic()))
+            except queue.Empty:
+                raise TimeoutError(f"No reply from relay worker within {timeout}s")
+            # Skip late replies to requests that already timed out
+            if seq == self._seq:
+                break
+        if status != 'ok':
+            raise RuntimeError(result)
+        return result
+
+    def write(self, report, timeout=REPLY_TIMEOUT):
+        """Write one report"""
+        return self._request('write', report, timeout)
+
+    def query(self, report, timeout=REPLY_TIMEOUT):
+        """Write one report and return the device's reply"""
+        return self._request('query', report, timeout)
+
+    def stop(self):
+        """Ask the worker to close the device and exit"""
+        if self.process is None:
+            return
+        if self.process.is_alive():
+            self.in_q.put(None)
+            self.process.join(timeout=1)
+            if self.process.is_alive():
+                self.process.terminate()
+        self.process = None
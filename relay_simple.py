@@ -6,8 +6,11 @@ Uses direct HID commands
 
 import sys
 import time
+import atexit
+import asyncio
 import hid
 import argparse
+from console_input import ConsoleReader
 
 # Device identifiers
 VENDOR_ID = 0x16c0
@@ -43,10 +46,43 @@ def find_relay():
         print(f"Error: {e}")
         return None
 
+# Open devices keyed by (VID, PID), kept for the life of the process
+_DEVICE_POOL = {}
+
+def get_relay():
+    """Return the pooled relay device, opening it on first use"""
+    key = (VENDOR_ID, PRODUCT_ID)
+    device = _DEVICE_POOL.get(key)
+    if device is None:
+        device = find_relay()
+        if device:
+            _DEVICE_POOL[key] = device
+    return device
+
+def _discard(device):
+    """Drop a failed device from the pool so the next call reopens it"""
+    for key, pooled in list(_DEVICE_POOL.items()):
+        if pooled is device:
+            del _DEVICE_POOL[key]
+            try:
+                device.close()
+            except Exception:
+                pass
+
+@atexit.register
+def close_pool():
+    """Close all pooled devices"""
+    while _DEVICE_POOL:
+        _, device = _DEVICE_POOL.popitem()
+        try:
+            device.close()
+        except Exception as e:
+            print(f"Error: {e}")
+
 def send_command(command, device=None):
     """Send command to relay"""
     if not device:
-        device = find_relay()
+        device = get_relay()
         if not device:
             print("Error: Relay not found!")
             return False
@@ -57,10 +93,8 @@ def send_command(command, device=None):
         return True
     except Exception as e:
         print(f"Error: {e}")
+        _discard(device)
         return False
-    finally:
-        if device:
-            device.close()
 
 def control_relay(relay_num, state, device=None):
     """Control specific relay"""
@@ -69,9 +103,28 @@ def control_relay(relay_num, state, device=None):
         return send_command(COMMANDS[cmd_key], device)
     return False
 
-def interactive_mode():
+async def _run_blocking(func, *args):
+    """Run a blocking call on the default executor"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, func, *args)
+
+async def async_send_command(command, device=None):
+    """Send command to relay without blocking the event loop"""
+    return await _run_blocking(send_command, command, device)
+
+async def async_control_relay(relay_num, state, device=None):
+    """Control specific relay without blocking the event loop"""
+    return await _run_blocking(control_relay, relay_num, state, device)
+
+async def auto_off(relay_num, delay, device=None):
+    """Turn a relay off after delay seconds"""
+    await asyncio.sleep(delay)
+    if await async_control_relay(relay_num, False, device):
+        print(f"\nRelay {relay_num} OFF")
+
+async def interactive_mode():
     """Interactive relay control"""
-    device = find_relay()
+    device = await _run_blocking(get_relay)
     if not device:
         print("Error: Relay not found!")
         return
@@ -85,40 +138,49 @@ def interactive_mode():
     print("a: Toggle ALL Relays")
     print("q: Quit")
     
-    while True:
-        cmd = input("\nEnter command (1/2/3/4/a/q): ").lower()
+    # Pending auto-off timers, so the prompt comes back straight away
+    timers = set()
+    console = ConsoleReader()
+    
+    try:
+        while True:
+            cmd = (await console.input("\nEnter command (1/2/3/4/a/q): ")).lower()
         
-        if cmd == 'q':
-            # Turn off all relays before quitting
-            send_command(COMMANDS['all_off'], device)
-            device.close()
-            break
-        elif cmd in ['1', '2']:
-            relay_num = int(cmd)
-            # Toggle ON
-            if control_relay(relay_num, True, device):
-                print(f"Relay {relay_num} ON")
-            time.sleep(1)
-            # Toggle OFF
-            if control_relay(relay_num, False, device):
-                print(f"Relay {relay_num} OFF")
-        elif cmd in ['3', '4']:
-            relay_num = int(cmd) - 2
-            # Turn ON
-            if control_relay(relay_num, True, device):
-                print(f"Relay {relay_num} ON")
-                time.sleep(10)
-                # Turn OFF
-                if control_relay(relay_num, False, device):
+            if cmd == 'q':
+                break
+            elif cmd in ['1', '2']:
+                relay_num = int(cmd)
+                # Toggle ON
+                if await async_control_relay(relay_num, True, device):
+                    print(f"Relay {relay_num} ON")
+                await asyncio.sleep(1)
+                # Toggle OFF
+                if await async_control_relay(relay_num, False, device):
                     print(f"Relay {relay_num} OFF")
-        elif cmd == 'a':
-            # Toggle ALL ON
-            if send_command(COMMANDS['all_on'], device):
-                print("All relays ON")
-            time.sleep(1)
-            # Toggle ALL OFF
-            if send_command(COMMANDS['all_off'], device):
-                print("All relays OFF")
+            elif cmd in ['3', '4']:
+                relay_num = int(cmd) - 2
+                # Turn ON, and OFF again in the background
+                if await async_control_relay(relay_num, True, device):
+                    print(f"Relay {relay_num} ON")
+                    task = asyncio.create_task(auto_off(relay_num, 10, device))
+                    timers.add(task)
+                    task.add_done_callback(timers.discard)
+            elif cmd == 'a':
+                # Toggle ALL ON
+                if await async_send_command(COMMANDS['all_on'], device):
+                    print("All relays ON")
+                await asyncio.sleep(1)
+                # Toggle ALL OFF
+                if await async_send_command(COMMANDS['all_off'], device):
+                    print("All relays OFF")
+    except (EOFError, asyncio.CancelledError):
+        # End of input, or Ctrl-C arriving as a cancellation under asyncio.run
+        pass
+    finally:
+        # Pending auto-off timers won't run any more, so switch everything off here
+        for task in timers:
+            task.cancel()
+        await async_send_command(COMMANDS['all_off'], device)
 
 def main():
     """Main function for command-line usage"""
@@ -131,13 +193,13 @@ def main():
                        help='Duration in seconds (optional)')
     
     if len(sys.argv) == 1:
-        interactive_mode()
+        asyncio.run(interactive_mode())
         return
     
     args = parser.parse_args()
     
     # Execute command
-    device = find_relay()
+    device = get_relay()
     if device:
         if control_relay(args.relay, args.action == 'on', device):
             print(f"Relay {args.relay} {args.action.upper()}")
@@ -147,7 +209,6 @@ def main():
                 time.sleep(args.duration)
                 control_relay(args.relay, False, device)
                 print(f"Relay {args.relay} OFF")
-        device.close()
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -4,7 +4,10 @@ USB Device Detection Script
 Specifically for finding CH340 or similar USB-Serial devices on Mac
 """
 
+import os
 import sys
+import glob
+import stat
 import subprocess
 import serial.tools.list_ports
 
@@ -39,9 +42,12 @@ def check_dev_entries():
     """Check /dev entries"""
     print("\n=== /dev Entries ===")
     try:
-        result = subprocess.run(['ls', '-l', '/dev/tty.*'], 
-                              capture_output=True, text=True)
-        print(result.stdout)
+        paths = sorted(glob.glob('/dev/tty.*'))
+        if not paths:
+            print("No /dev/tty.* entries found")
+        for path in paths:
+            st = os.lstat(path)
+            print(f"{stat.filemode(st.st_mode)} {path}")
     except Exception as e:
         print(f"Error checking /dev entries: {e}")
 
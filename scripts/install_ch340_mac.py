@@ -7,11 +7,16 @@ Downloads and installs the official CH340 driver
 import os
 import sys
 import subprocess
+import logging
 import tempfile
-import shutil
+import zipfile
 import requests
 from pathlib import Path
 
+# The driver checks are shared with install_ch340.py in the project root
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from driver_verify import DRIVER_SHA256, verify_driver_zip
+
 def check_system():
     """Check system compatibility"""
     print("Checking system...")
@@ -29,34 +34,63 @@ def download_driver(temp_dir):
     print("\nDownloading CH340 driver...")
     
     # Direct download URL for Mac driver
-    url = "http://www.wch.cn/downloads/file/178.html"
+    url = "https://www.wch.cn/downloads/file/178.html"
     
     try:
-        # Download driver
-        response = requests.get(url, allow_redirects=True)
-        response.raise_for_status()
+        # The package is installed as root, so only fetch it when it can be verified
+        if not DRIVER_SHA256:
+            raise ValueError("no pinned driver checksum (CH340_DRIVER_SHA256), skipping automatic download")
         
-        # Save to temporary file
+        # Stream the download to disk in 64 KiB chunks instead of holding it in memory
         zip_path = os.path.join(temp_dir, "CH34xVCPDriver.zip")
-        with open(zip_path, 'wb') as f:
-            f.write(response.content)
+        with requests.get(url, stream=True, allow_redirects=True, timeout=30) as response:
+            response.raise_for_status()
+            with open(zip_path, 'wb') as f:
+                for chunk in response.iter_content(chunk_size=64 * 1024):
+                    f.write(chunk)
         
+        if not verify_driver_zip(zip_path):
+            os.remove(zip_path)
+            raise ValueError("downloaded driver failed verification")
         print("✓ Download complete")
         return zip_path
     except Exception as e:
         print(f"Error downloading driver: {e}")
         print("\nPlease download manually:")
-        print("1. Visit: http://www.wch.cn/downloads/CH341SER_MAC_ZIP.html")
+        print("1. Visit: https://www.wch.cn/downloads/CH341SER_MAC_ZIP.html")
         print("2. Click the download button")
         print("3. Save the file as 'CH34xVCPDriver.zip'")
         print("4. Move the file to the current directory")
         
         # Wait for manual download
         while True:
-            if os.path.exists('CH34xVCPDriver.zip'):
+            if os.path.exists('CH34xVCPDriver.zip') and verify_driver_zip('CH34xVCPDriver.zip'):
                 return os.path.abspath('CH34xVCPDriver.zip')
             input("Press Enter after downloading the file (or Ctrl+C to cancel)...")
 
+def extract_pkg(zip_path, temp_dir):
+    """Extract only the installer package from the driver zip"""
+    with zipfile.ZipFile(zip_path) as zf:
+        names = zf.namelist()
+        
+        # A .pkg can be a flat file or a bundle directory
+        pkg_name = None
+        for name in names:
+            parts = name.rstrip('/').split('/')
+            for i, part in enumerate(parts):
+                if part.endswith('.pkg'):
+                    pkg_name = '/'.join(parts[:i + 1])
+                    break
+            if pkg_name:
+                break
+        if pkg_name is None:
+            return None
+        
+        members = [n for n in names if n == pkg_name or n.startswith(pkg_name + '/')]
+        zf.extractall(temp_dir, members=members)
+    
+    return os.path.join(temp_dir, pkg_name)
+
 def install_driver(pkg_path):
     """Install driver package"""
     print("\nInstalling driver...")
@@ -100,6 +134,7 @@ def setup_permissions():
 
 def main():
     """Main installation routine"""
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
     print("=== CH340 Driver Installation ===")
     
     try:
@@ -112,19 +147,9 @@ def main():
             # Download driver
             zip_path = download_driver(temp_dir)
             
-            # Extract package
+            # Extract installer package
             print("\nExtracting driver package...")
-            extract_dir = os.path.join(temp_dir, 'driver')
-            os.makedirs(extract_dir, exist_ok=True)
-            shutil.unpack_archive(zip_path, extract_dir)
-            
-            # Find installer package
-            pkg_file = None
-            for root, _, files in os.walk(extract_dir):
-                for file in files:
-                    if file.endswith('.pkg'):
-                        pkg_file = os.path.join(root, file)
-                        break
+            pkg_file = extract_pkg(zip_path, temp_dir)
             
             if not pkg_file:
                 print("Error: Could not find installer package")
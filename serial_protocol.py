@@ -9,10 +9,28 @@ Implements the serial protocol for NOYITO 2-channel USB relay:
 """
 
 import time
+import functools
 from typing import List, Optional, Tuple
 import serial
 import serial.tools.list_ports
 
+# How long a serial port enumeration is reused, so plug/unplug still shows up
+PORT_CACHE_TTL = 2.0
+
+@functools.lru_cache(maxsize=1)
+def _comports(bucket: int) -> tuple:
+    return tuple(serial.tools.list_ports.comports())
+
+def get_ports(refresh: bool = False) -> tuple:
+    """Return comports(), re-enumerating at most once per PORT_CACHE_TTL"""
+    if refresh:
+        _comports.cache_clear()
+    return _comports(int(time.monotonic() // PORT_CACHE_TTL))
+
+def is_ch340(port) -> bool:
+    """True if a comports() entry is a CH340 USB-serial chip"""
+    return "CH340" in (port.description or "").upper() or "CH340" in (port.hwid or "").upper()
+
 class RelayProtocol:
     """NOYITO USB Relay protocol implementation"""
     
@@ -21,6 +39,10 @@ class RelayProtocol:
     STATE_ON = 0x01
     STATE_OFF = 0x00
     QUERY_CMD = 0xFF
+    # Upper bound on each status reply line
+    STATUS_MAX_BYTES = 64
+    # The status reply is one CHn:ON/OFF line per channel
+    RELAY_CHANNELS = 2
     
     # Command format:
     # Byte 1: Start flag (0xA0)
@@ -31,39 +53,36 @@ class RelayProtocol:
     @staticmethod
     def find_relay_port() -> Optional[str]:
         """Find the relay's serial port"""
-        # Try to find CH340 device first
-        ports = list(serial.tools.list_ports.grep("CH340"))
-        if ports:
-            return ports[0].device
-            
-        # Fall back to any USB serial device
-        ports = list(serial.tools.list_ports.comports())
-        for port in ports:
-            if "USB" in port.description:
+        # Prefer a CH340 device, falling back to any USB serial device
+        fallback = None
+        for port in get_ports():
+            if is_ch340(port):
                 return port.device
+            if fallback is None and "USB" in port.description:
+                fallback = port.device
                 
-        return None
+        return fallback
     
     @staticmethod
     def calculate_checksum(data: List[int]) -> int:
         """Calculate command checksum"""
         return sum(data) & 0xFF
     
+    # Every frame build_command can return, keyed by (relay, state)
+    _PACKETS = {
+        (1, True):  b'\xa0\x01\x01\xa2',
+        (1, False): b'\xa0\x01\x00\xa1',
+        (2, True):  b'\xa0\x02\x01\xa3',
+        (2, False): b'\xa0\x02\x00\xa2',
+    }
+    
     @staticmethod
     def build_command(relay_num: int, state: bool) -> bytes:
         """Build relay command with checksum"""
-        if relay_num not in [1, 2]:
-            raise ValueError("Relay number must be 1 or 2")
-            
-        cmd = [
-            RelayProtocol.START_FLAG,  # Start flag
-            relay_num,                 # Switch address
-            0x01 if state else 0x00    # Operation
-        ]
-        
-        # Add checksum
-        cmd.append(RelayProtocol.calculate_checksum(cmd))
-        return bytes(cmd)
+        try:
+            return RelayProtocol._PACKETS[relay_num, bool(state)]
+        except KeyError:
+            raise ValueError("Relay number must be 1 or 2") from None
     
     @staticmethod
     def parse_status(response: str) -> Tuple[bool, bool]:
@@ -78,14 +97,28 @@ class RelayProtocol:
         if not self.port:
             raise RuntimeError("Could not find relay serial port")
             
+        # Configure before opening: the CH340 resets when DTR/RTS toggle on
+        # open, which swallows the first commands for about a second.
         self.serial = serial.Serial(
-            port=self.port,
+            port=None,
             baudrate=baud_rate,
             bytesize=serial.EIGHTBITS,
             parity=serial.PARITY_NONE,
             stopbits=serial.STOPBITS_ONE,
-            timeout=1
+            timeout=1,
+            # Return a partial line after a short gap instead of waiting out the timeout
+            inter_byte_timeout=0.05,
+            rtscts=False,
+            dsrdtr=False
         )
+        self.serial.port = self.port
+        self.serial.dtr = False
+        self.serial.rts = False
+        self.serial.open()
+        
+        # Driver buffer sizes can only be set on Windows
+        if hasattr(self.serial, 'set_buffer_size'):
+            self.serial.set_buffer_size(rx_size=4096, tx_size=1024)
     
     def close(self):
         """Close serial connection"""
@@ -105,23 +138,72 @@ class RelayProtocol:
         if not self.serial or not self.serial.is_open:
             raise RuntimeError("Serial port not open")
             
-        # Wait for data
-        start_time = time.time()
-        while (time.time() - start_time) * 1000 < timeout_ms:
-            if self.serial.in_waiting:
-                return self.serial.read_until(b'\n').decode('ascii')
-            time.sleep(0.01)
-            
-        return None
+        # Let the driver block for the data rather than polling in_waiting
+        timeout = timeout_ms / 1000.0
+        if self.serial.timeout != timeout:
+            self.serial.timeout = timeout
+        data = b''
+        for _ in range(self.RELAY_CHANNELS):
+            line = self.serial.read_until(b'\n', self.STATUS_MAX_BYTES)
+            if not line:
+                # Timed out; return whatever arrived
+                break
+            data += line
+        return data.decode('ascii') if data else None
     
     def set_relay(self, relay_num: int, state: bool) -> bool:
         """Set relay state"""
         cmd = self.build_command(relay_num, state)
         return self.send_command(cmd)
     
+    @staticmethod
+    def build_batch(ops: List[Tuple[int, bool]]) -> bytes:
+        """Build the frames for several (relay_num, state) pairs"""
+        return b''.join(RelayProtocol.build_command(n, s) for n, s in ops)
+    
+    def set_relays(self, ops: List[Tuple[int, bool]]) -> bool:
+        """Set several relays with a single write"""
+        return self.send_command(self.build_batch(ops))
+    
+    @staticmethod
+    def build_state_mask_command(mask: int) -> bytes:
+        """Build the frames setting both relays from a bit mask
+        
+        Bit 0 is relay 1 and bit 1 is relay 2. The board has no combined
+        opcode, so this is both channel frames back to back.
+        """
+        return (RelayProtocol.build_command(1, bool(mask & 0b01)) +
+                RelayProtocol.build_command(2, bool(mask & 0b10)))
+    
+    def set_state_mask(self, mask: int) -> bool:
+        """Set both relays from a bit mask with a single write"""
+        return self.send_command(self.build_state_mask_command(mask))
+    
+    def set_all(self, state: bool) -> bool:
+        """Set both relays to the same state with a single write"""
+        return self.set_state_mask(0b11 if state else 0b00)
+    
+    def pipelined_set(self, commands: List[Tuple[int, bool]]) -> Tuple[bool, bool]:
+        """Send several relay commands and a status query in one write
+        
+        The board handles frames in order, so the single status reply
+        reflects every command before it.
+        """
+        frames = self.build_batch(commands)
+        self.serial.reset_input_buffer()
+        if not self.send_command(frames + bytes([self.QUERY_CMD])):
+            raise RuntimeError("Failed to send commands")
+        
+        response = self.read_response()
+        if response:
+            return self.parse_status(response)
+        else:
+            raise RuntimeError("No response to status query")
+    
     def query_status(self) -> Tuple[bool, bool]:
         """Query relay status"""
-        # Send query command
+        # Drop stale bytes so the reply read is this query's
+        self.serial.reset_input_buffer()
         self.send_command(bytes([self.QUERY_CMD]))
         
         # Read response
@@ -162,22 +244,16 @@ def main():
             
             for relay_num, state in test_sequence:
                 logger.info(f"\nSetting Relay {relay_num} {'ON' if state else 'OFF'}")
-                if relay.set_relay(relay_num, state):
-                    logger.info("Command sent successfully")
-                    
-                    # Verify state
-                    time.sleep(0.1)
-                    status = relay.query_status()
-                    logger.info(f"New states: 1={'ON' if status[0] else 'OFF'}, 2={'ON' if status[1] else 'OFF'}")
-                else:
-                    logger.error("Failed to send command")
+                # Command and verification query go out in the same write
+                status = relay.pipelined_set([(relay_num, state)])
+                logger.info(f"New states: 1={'ON' if status[0] else 'OFF'}, 2={'ON' if status[1] else 'OFF'}")
                 
+                # Pause so each click can be seen and heard
                 time.sleep(1)
             
     except Exception as e:
         logger.error(f"Error: {e}")
-        import traceback
-        logger.debug(f"Traceback: {traceback.format_exc()}")
+        logger.debug("Traceback:", exc_info=True)
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
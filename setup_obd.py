@@ -1,8 +1,82 @@
 import sys
 import os
+import json
+import hashlib
+import argparse
 import subprocess
+import glob
 import platform
 import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from setup_tools import have
+
+try:
+    from importlib import metadata
+except ImportError:  # Python < 3.8
+    metadata = None
+
+# platform.system() calls uname() each time, so look it up once
+_SYSTEM = platform.system().lower()
+
+# Remembers when packages were last checked so re-runs can skip network work
+STATE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "obd_setup")
+STATE_FILE = os.path.join(STATE_DIR, "state.json")
+BREW_UPDATE_STAMP = os.path.join(STATE_DIR, "brew_update.ts")
+PIP_RECHECK_SECONDS = 24 * 3600
+BREW_UPDATE_SECONDS = 6 * 3600
+
+def _state_key(name, spec):
+    # Keyed per interpreter, so a new venv or Python doesn't inherit the skip
+    return hashlib.sha1(f"{sys.executable}\0{sys.prefix}\0{name}\0{spec}".encode()).hexdigest()
+
+def _is_installed(dist_name):
+    """True if dist_name is installed for this interpreter (assumed so without importlib.metadata)"""
+    if metadata is None:
+        return True
+    try:
+        metadata.version(dist_name)
+        return True
+    except metadata.PackageNotFoundError:
+        return False
+
+def _load_state():
+    try:
+        with open(STATE_FILE) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _save_state(state):
+    try:
+        os.makedirs(STATE_DIR, exist_ok=True)
+        tmp_path = STATE_FILE + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, STATE_FILE)
+    except OSError as e:
+        print(f"Could not save setup state: {e}")
+
+def _brew_update_is_fresh():
+    try:
+        return time.time() - os.path.getmtime(BREW_UPDATE_STAMP) < BREW_UPDATE_SECONDS
+    except OSError:
+        return False
+
+def _touch_brew_update():
+    try:
+        os.makedirs(STATE_DIR, exist_ok=True)
+        with open(BREW_UPDATE_STAMP, "w") as f:
+            f.write(str(time.time()))
+    except OSError:
+        pass
+
+# Keeps output from worker threads from interleaving
+_print_lock = threading.Lock()
+
+def _locked_print(*args, **kwargs):
+    with _print_lock:
+        print(*args, **kwargs)
 
 def check_python_version():
     print("\nChecking Python version...")
@@ -27,11 +101,11 @@ def run_command(command, check=True, shell=False):
         print(f"Error: {e.stderr}")
         return None
 
-def check_macos_dependencies():
+def check_macos_dependencies(force=False):
     print("\nChecking macOS dependencies...")
     
     # Check if Homebrew is installed
-    if not run_command(["which", "brew"]):
+    if not have("brew"):
         print("Homebrew not found. Installing Homebrew...")
         install_script = '/bin/bash -c "$(curl -fsSL https://raw.githubusercontent.com/Homebrew/install/HEAD/install.sh)"'
         print("Please run this command in your terminal to install Homebrew:")
@@ -40,9 +114,13 @@ def check_macos_dependencies():
     
     print("Homebrew is installed")
     
-    # Update Homebrew
-    print("\nUpdating Homebrew...")
-    run_command(["brew", "update"])
+    # Update Homebrew, at most every BREW_UPDATE_SECONDS
+    if not force and _brew_update_is_fresh():
+        print("\nHomebrew was updated recently, skipping update")
+    else:
+        print("\nUpdating Homebrew...")
+        if run_command(["brew", "update"]) is not None:
+            _touch_brew_update()
     
     # Required Homebrew packages
     brew_packages = [
@@ -51,58 +129,91 @@ def check_macos_dependencies():
         "python@3.9"  # Ensure consistent Python version
     ]
     
-    for package in brew_packages:
-        print(f"\nChecking {package}...")
-        if not run_command(["brew", "list", package], check=False):
-            print(f"Installing {package}...")
-            if not run_command(["brew", "install", package]):
-                print(f"Failed to install {package}")
-                return False
-        else:
-            print(f"{package} is already installed")
+    def is_installed(package):
+        installed = bool(run_command(["brew", "list", package], check=False))
+        _locked_print(f"{package} is {'already installed' if installed else 'missing'}")
+        return installed
+    
+    # brew list is read-only, so all packages can be checked at once
+    print("\nChecking packages...")
+    with ThreadPoolExecutor(max_workers=len(brew_packages)) as pool:
+        installed = list(pool.map(is_installed, brew_packages))
+    
+    # brew holds a global lock while installing, so missing packages go in one call
+    missing = [pkg for pkg, ok in zip(brew_packages, installed) if not ok]
+    if missing:
+        print(f"\nInstalling {', '.join(missing)}...")
+        if run_command(["brew", "install", *missing]) is None:
+            print(f"Failed to install {', '.join(missing)}")
+            return False
     
     return True
 
-def check_python_packages():
+def check_python_packages(force=False):
     print("\nChecking Python packages...")
     
-    # Upgrade pip first
-    run_command([sys.executable, "-m", "pip", "install", "--upgrade", "pip"])
-    
     required_packages = {
         "pyserial": "pyserial>=3.5",
         "python-OBD": "git+https://github.com/brendan-w/python-OBD.git#egg=obd",
-        "pyusb": "pyusb>=1.2.1",
         "hidapi": "hidapi>=0.14.0"
     }
+    # Installed distribution names, where they differ from the names above
+    dist_names = {"python-OBD": "obd"}
     
-    for package, install_spec in required_packages.items():
-        print(f"\nInstalling {package}...")
-        try:
-            run_command([sys.executable, "-m", "pip", "install", "--upgrade", install_spec])
-        except Exception as e:
-            print(f"Failed to install {package}: {e}")
-            return False
+    # Skip packages checked within PIP_RECHECK_SECONDS that are still installed
+    state = _load_state()
+    now = time.time()
+    stale = {
+        name: spec for name, spec in required_packages.items()
+        if force
+        or now - state.get(_state_key(name, spec), 0) >= PIP_RECHECK_SECONDS
+        or not _is_installed(dist_names.get(name, name))
+    }
+    if not stale:
+        print("Python packages were checked recently, skipping (use --force to recheck)")
+        return True
+    
+    # Upgrade pip first
+    run_command([sys.executable, "-m", "pip", "install", "--upgrade", "pip"])
+    
+    # One pip run resolves and installs everything together
+    print(f"\nInstalling {', '.join(stale)}...")
+    if run_command([sys.executable, "-m", "pip", "install", "--upgrade", *stale.values()]) is None:
+        print("Failed to install Python packages")
+        return False
+    
+    for name, spec in stale.items():
+        state[_state_key(name, spec)] = now
+    _save_state(state)
     
     return True
 
 def check_usb_devices():
     print("\nChecking USB devices...")
     
-    # Check USB devices using system_profiler
-    usb_info = run_command(["system_profiler", "SPUSBDataType"])
+    # Stream system_profiler output line by line instead of buffering it all
     print("\nAvailable USB devices:")
-    print(usb_info)
+    try:
+        with subprocess.Popen(["system_profiler", "SPUSBDataType"],
+                              stdout=subprocess.PIPE, text=True, bufsize=1) as proc:
+            for line in proc.stdout:
+                print(line, end='')
+    except OSError as e:
+        print(f"Error running system_profiler: {e}")
+        return False
     
     return True
 
+def list_tty_ports():
+    """Return the /dev/tty.* device paths"""
+    return sorted(glob.glob("/dev/tty.*"))
+
 def check_serial_ports():
     print("\nChecking serial ports...")
     
     # List all potential serial ports
-    serial_ports = run_command(["ls", "/dev/tty.*"])
     print("\nAvailable serial ports:")
-    print(serial_ports)
+    print("\n".join(list_tty_ports()))
     
     return True
 
@@ -115,7 +226,7 @@ def check_obd_connection():
         ports = obd.scan_serial()
         if not ports:
             print("No OBD adapters found. Available ports:")
-            print(run_command(["ls", "/dev/tty.*"]))
+            print("\n".join(list_tty_ports()))
             return False
         
         print(f"Found OBD ports: {ports}")
@@ -141,20 +252,25 @@ def check_obd_connection():
         return False
 
 def main():
+    parser = argparse.ArgumentParser(description="macOS OBD setup and requirements check")
+    parser.add_argument("--force", action="store_true",
+                        help="Update Homebrew and reinstall packages even if checked recently")
+    args = parser.parse_args()
+    
     print("=== macOS OBD Setup and Requirements Check ===")
     
-    if platform.system() != "Darwin":
+    if _SYSTEM != "darwin":
         print("This script is for macOS only!")
         return
     
     try:
         check_python_version()
         
-        if not check_macos_dependencies():
+        if not check_macos_dependencies(force=args.force):
             print("\nFailed to install macOS dependencies")
             return
             
-        if not check_python_packages():
+        if not check_python_packages(force=args.force):
             print("\nFailed to install Python packages")
             return
         
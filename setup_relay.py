@@ -3,7 +3,27 @@ import os
 import sys
 import subprocess
 import platform
-import shutil
+import time
+import functools
+from setup_tools import have
+
+# platform.system() calls uname() each time, so look it up once
+_SYSTEM = platform.system().lower()
+
+RELAY_VID = 0x16c0
+RELAY_PID = 0x05df
+
+# How long a HID enumeration is reused
+HID_CACHE_SECONDS = 5
+
+@functools.lru_cache(maxsize=1)
+def _hid_devices(bucket):
+    import hid
+    return tuple(hid.enumerate())
+
+def hid_devices():
+    """Return hid.enumerate(), querying the USB bus at most once per HID_CACHE_SECONDS"""
+    return _hid_devices(int(time.monotonic()) // HID_CACHE_SECONDS)
 
 def check_python_version():
     """Check if Python version is compatible"""
@@ -27,12 +47,12 @@ def check_pip():
 
 def install_system_dependencies():
     """Install system-level dependencies"""
-    system = platform.system().lower()
+    system = _SYSTEM
     print(f"\nInstalling system dependencies for {system}...")
     
     try:
         if system == 'darwin':  # macOS
-            if not shutil.which('brew'):
+            if not have('brew'):
                 print("Installing Homebrew...")
                 subprocess.check_call(['/bin/bash', '-c', 
                     '$(curl -fsSL https://raw.githubusercontent.com/Homebrew/install/HEAD/install.sh)'])
@@ -42,14 +62,14 @@ def install_system_dependencies():
             
         elif system == 'linux':
             # Check for different package managers
-            if shutil.which('apt-get'):  # Debian/Ubuntu
+            if have('apt-get'):  # Debian/Ubuntu
                 subprocess.check_call(['sudo', 'apt-get', 'update'])
                 subprocess.check_call(['sudo', 'apt-get', 'install', '-y',
                     'libhidapi-dev', 'python3-dev', 'build-essential'])
-            elif shutil.which('dnf'):  # Fedora
+            elif have('dnf'):  # Fedora
                 subprocess.check_call(['sudo', 'dnf', 'install', '-y',
                     'hidapi-devel', 'python3-devel', 'gcc'])
-            elif shutil.which('pacman'):  # Arch
+            elif have('pacman'):  # Arch
                 subprocess.check_call(['sudo', 'pacman', '-Sy',
                     'hidapi', 'python-pip'])
             else:
@@ -69,7 +89,7 @@ def install_system_dependencies():
 
 def setup_udev_rules():
     """Setup udev rules on Linux"""
-    if platform.system().lower() == 'linux':
+    if _SYSTEM == 'linux':
         print("\nSetting up udev rules...")
         rule = 'SUBSYSTEM=="hidraw", ATTRS{idVendor}=="16c0", ATTRS{idProduct}=="05df", MODE="0666"'
         rule_path = '/etc/udev/rules.d/50-usb-relay.rules'
@@ -90,12 +110,9 @@ def install_python_requirements():
     """Install Python package requirements"""
     print("\nInstalling Python requirements...")
     try:
-        # First install build dependencies
+        # Build dependencies and project requirements in one pip run
         subprocess.check_call([sys.executable, '-m', 'pip', 'install', '--upgrade',
-            'wheel', 'setuptools'])
-        
-        # Then install project requirements
-        subprocess.check_call([sys.executable, '-m', 'pip', 'install', '-r', 'requirements.txt'])
+            'wheel', 'setuptools', '-r', 'requirements.txt'])
         print("Python requirements installed successfully")
     except subprocess.CalledProcessError as e:
         print(f"Error installing Python requirements: {e}")
@@ -105,19 +122,22 @@ def verify_installation():
     """Verify the installation"""
     print("\nVerifying installation...")
     try:
-        # Try importing key modules
-        import hid
+        # Importing hid here also checks the module installed correctly
+        devices = hid_devices()
         
-        # List HID devices
-        print("\nDetected HID devices:")
-        for device in hid.enumerate():
-            print(f"\nVID:PID: {device['vendor_id']:04x}:{device['product_id']:04x}")
-            print(f"Manufacturer: {device.get('manufacturer_string', 'N/A')}")
-            print(f"Product: {device.get('product_string', 'N/A')}")
-            
-            # Check if it's our relay
-            if device['vendor_id'] == 0x16c0 and device['product_id'] == 0x05df:
-                print("*** NOYITO USB Relay detected! ***")
+        relay = next((d for d in devices
+                      if d['vendor_id'] == RELAY_VID and d['product_id'] == RELAY_PID), None)
+        if relay:
+            print("\n*** NOYITO USB Relay detected! ***")
+            print(f"Manufacturer: {relay.get('manufacturer_string', 'N/A')}")
+            print(f"Product: {relay.get('product_string', 'N/A')}")
+        else:
+            # Only list everything when the relay is missing
+            print("\nRelay not found. Detected HID devices:")
+            for device in devices:
+                print(f"\nVID:PID: {device['vendor_id']:04x}:{device['product_id']:04x}")
+                print(f"Manufacturer: {device.get('manufacturer_string', 'N/A')}")
+                print(f"Product: {device.get('product_string', 'N/A')}")
         
         print("\nInstallation verification complete!")
         return True
@@ -0,0 +1,12 @@
+#!/usr/bin/env python3
+"""
+Shared helpers for the setup scripts
+"""
+
+import shutil
+import functools
+
+@functools.lru_cache(maxsize=None)
+def have(tool):
+    """Return True if tool is on PATH, without spawning a process"""
+    return shutil.which(tool) is not None
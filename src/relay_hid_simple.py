@@ -4,13 +4,20 @@ Simple HID Relay Control
 Specifically for NOYITO USB relay on Mac
 """
 
-import hid
 import time
 import sys
 
+REPORT_SIZE = 8
+
+# Report buffer reused for every command instead of building a padded list
+_BUF = bytearray(REPORT_SIZE)
+_ZEROS = bytes(REPORT_SIZE)
+
 def find_relay():
     """Find and open the relay device"""
     try:
+        import hid
+        
         # Open the device
         h = hid.device()
         h.open(0x16c0, 0x05df)
@@ -26,9 +33,10 @@ def find_relay():
 def send_command(device, command):
     """Send command and read response"""
     try:
-        # Commands must be 8 bytes
-        padded_command = command + [0] * (8 - len(command))
-        device.write(padded_command)
+        # Commands must be 8 bytes, zero padded
+        _BUF[:] = _ZEROS
+        _BUF[:len(command)] = command
+        device.write(bytes(_BUF))
         
         # Read response
         response = device.read(8)
@@ -38,6 +46,18 @@ def send_command(device, command):
         print(f"Command error: {e}")
         return False
 
+# Menu text, written in one call per redraw
+_MENU = (
+    "\nCommands:\n"
+    "1: Turn Relay 1 ON\n"
+    "2: Turn Relay 1 OFF\n"
+    "3: Turn Relay 2 ON\n"
+    "4: Turn Relay 2 OFF\n"
+    "5: Toggle Relay 1\n"
+    "6: Toggle Relay 2\n"
+    "q: Quit\n"
+)
+
 def main():
     print("=== Simple HID Relay Control ===")
     
@@ -49,14 +69,8 @@ def main():
     
     try:
         while True:
-            print("\nCommands:")
-            print("1: Turn Relay 1 ON")
-            print("2: Turn Relay 1 OFF")
-            print("3: Turn Relay 2 ON")
-            print("4: Turn Relay 2 OFF")
-            print("5: Toggle Relay 1")
-            print("6: Toggle Relay 2")
-            print("q: Quit")
+            sys.stdout.write(_MENU)
+            sys.stdout.flush()
             
             cmd = input("\nEnter command (1-6/q): ").strip().lower()
             
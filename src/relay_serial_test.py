@@ -4,24 +4,95 @@ USB Relay Control using Serial Protocol
 For NOYITO USB relay on Mac M-series
 """
 
+import os
+import re
 import sys
+import json
 import time
-import serial
+import hashlib
+import platform
 import signal
 import logging
-from serial.tools import list_ports
+import logging.handlers
 
 # Configure logging
+# The log file is only opened once something is written, and records are
+# buffered in memory and flushed every 1024 records, on ERROR, or at exit.
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+_file_handler = logging.FileHandler('relay_serial.log', delay=True)
+_file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
 logging.basicConfig(
     level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
+    format=LOG_FORMAT,
     handlers=[
-        logging.FileHandler('relay_serial.log'),
+        logging.handlers.MemoryHandler(1024, flushLevel=logging.ERROR, target=_file_handler),
         logging.StreamHandler(sys.stdout)
     ]
 )
 logger = logging.getLogger(__name__)
 
+# Known relay vendor IDs: HID relay and CH340
+VENDOR_IDS = frozenset(('16c0', '1a86'))
+_VID_RE = re.compile(r'VID:PID=(%s):' % '|'.join(sorted(VENDOR_IDS)), re.IGNORECASE)
+
+# Last port the relay was found on, so later runs can skip enumeration
+PORT_CACHE = os.path.join(os.path.expanduser('~'), '.cache', 'relay_control', 'port.json')
+
+def _host_key():
+    """Identify this machine so a cache copied elsewhere is ignored"""
+    return hashlib.sha1((platform.node() + platform.system()).encode()).hexdigest()
+
+def _load_cached_port():
+    """Return the cached port device if it belongs to this host and still exists
+    
+    /dev/tty.* names get reused, and the OBD adapter is often a CH340 too,
+    so connect() checks the port answers like the relay before using it.
+    """
+    try:
+        with open(PORT_CACHE) as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return None
+    device = cached.get('device')
+    if cached.get('host') != _host_key() or not device or not os.path.exists(device):
+        return None
+    return device
+
+def _save_cached_port(port):
+    """Remember where the relay was found"""
+    entry = {
+        'host': _host_key(),
+        'device': port.device,
+        'vid': port.vid,
+        'pid': port.pid,
+        'mtime': time.time()
+    }
+    try:
+        os.makedirs(os.path.dirname(PORT_CACHE), exist_ok=True)
+        tmp_path = PORT_CACHE + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, PORT_CACHE)
+    except OSError as e:
+        logger.debug(f"Could not save port cache: {e}")
+
+def _clear_cached_port():
+    try:
+        os.remove(PORT_CACHE)
+    except OSError:
+        pass
+
+# One "CHn:ON " / "CHn:OFF" line per channel in the status reply
+_STATUS_RE = re.compile(rb'CH(\d+):(ON|OFF)')
+RELAY_CHANNELS = 2
+
+# How long a freshly opened port gets to answer a status query
+HANDSHAKE_TIMEOUT = 0.5
+
+# Both relay frames back to back, so "all" is one write
+_ALL_ON = bytes([0xA0, 0x01, 0x01, 0xA2, 0xA0, 0x02, 0x01, 0xA3])
+_ALL_OFF = bytes([0xA0, 0x01, 0x00, 0xA1, 0xA0, 0x02, 0x00, 0xA2])
+
 class RelayController:
     """Serial-based relay controller"""
     
@@ -42,28 +113,32 @@ class RelayController:
         if self.connected:
             try:
                 self.close_all_relays()
-                time.sleep(0.1)
                 if self.serial:
                     self.serial.close()
             except Exception as e:
                 logger.error(f"Cleanup error: {e}")
     
-    def find_device(self):
+    def find_device(self, use_cache=True):
         """Find the USB relay device"""
         try:
-            # Known relay identifiers
-            VENDOR_IDS = ['16c0', '1a86']  # Include both HID and CH340
+            if use_cache:
+                device = _load_cached_port()
+                if device:
+                    logger.info(f"Using cached relay device at {device}")
+                    return device
+            
+            from serial.tools import list_ports
             
-            for port in list_ports.comports():
-                logger.info(f"Checking port: {port.device}")
-                logger.info(f"Description: {port.description}")
-                logger.info(f"Hardware ID: {port.hwid}")
-                
-                # Check if this is our device
-                if any(vid in port.hwid.lower() for vid in VENDOR_IDS):
-                    logger.info(f"Found relay device at {port.device}")
-                    return port.device
+            # grep filters on the hardware ID in pyserial's own loop
+            port = next(list_ports.grep(_VID_RE.pattern), None)
+            if port:
+                logger.info(f"Found relay device at {port.device}")
+                _save_cached_port(port)
+                return port.device
             
+            if logger.isEnabledFor(logging.DEBUG):
+                for port in list_ports.comports():
+                    logger.debug(f"Checked port: {port.device} ({port.description}, {port.hwid})")
             return None
             
         except Exception as e:
@@ -82,15 +157,20 @@ class RelayController:
                 logger.error("Relay device not found")
                 return False
             
-            # Open serial connection
-            self.serial = serial.Serial(
-                port=port,
-                baudrate=9600,
-                bytesize=serial.EIGHTBITS,
-                parity=serial.PARITY_NONE,
-                stopbits=serial.STOPBITS_ONE,
-                timeout=1
-            )
+            try:
+                self._open(port)
+                if not self._handshake():
+                    self.serial.close()
+                    raise RuntimeError("no relay status reply")
+            except Exception as e:
+                # The cached port may have gone stale or be another device; rescan once
+                logger.warning(f"Could not open {port}: {e}")
+                _clear_cached_port()
+                port = self.find_device(use_cache=False)
+                if not port:
+                    logger.error("Relay device not found")
+                    return False
+                self._open(port)
             
             self.connected = True
             logger.info(f"Connected to {port}")
@@ -101,6 +181,29 @@ class RelayController:
             self.connected = False
             return False
     
+    def _open(self, port):
+        """Open the serial connection"""
+        import serial
+        self.serial = serial.Serial(
+            port=port,
+            baudrate=9600,
+            bytesize=serial.EIGHTBITS,
+            parity=serial.PARITY_NONE,
+            stopbits=serial.STOPBITS_ONE,
+            timeout=1
+        )
+    
+    def _handshake(self):
+        """Check the open port answers a status query the way the relay does"""
+        timeout = self.serial.timeout
+        self.serial.timeout = HANDSHAKE_TIMEOUT
+        try:
+            self.serial.reset_input_buffer()
+            self.serial.write(bytes([0xFF]))
+            return _STATUS_RE.search(self.serial.read_until(b'\n', 64)) is not None
+        finally:
+            self.serial.timeout = timeout
+    
     def _send_command(self, command, retries=3):
         """Send command with retry logic"""
         if not self.connected and not self.connect():
@@ -109,7 +212,8 @@ class RelayController:
         for attempt in range(retries):
             try:
                 self.serial.write(command)
-                time.sleep(0.1)  # Allow time for command processing
+                # Wait only until the bytes have left the transmit buffer
+                self.serial.flush()
                 return True
             except Exception as e:
                 logger.error(f"Command error (attempt {attempt + 1}): {e}")
@@ -140,14 +244,12 @@ class RelayController:
     def open_all_relays(self):
         """Open all relays"""
         logger.info("Opening all relays")
-        return (self.open_relay(1) and 
-                self.open_relay(2))
+        return self._send_command(_ALL_ON)
     
     def close_all_relays(self):
         """Close all relays"""
         logger.info("Closing all relays")
-        return (self.close_relay(1) and 
-                self.close_relay(2))
+        return self._send_command(_ALL_OFF)
     
     def get_status(self):
         """Get relay status"""
@@ -155,15 +257,18 @@ class RelayController:
             if not self.connected and not self.connect():
                 return None
             
-            # Send status query
+            # Drop anything left from an earlier reply, then read one line
+            # per channel; each read blocks until its line arrives or the
+            # port timeout expires
+            self.serial.reset_input_buffer()
             self.serial.write(bytes([0xFF]))
-            time.sleep(0.1)
+            response = b''.join(self.serial.read_until(b'\n') for _ in range(RELAY_CHANNELS))
             
-            if self.serial.in_waiting:
-                response = self.serial.read(self.serial.in_waiting)
+            states = {int(ch): state == b'ON' for ch, state in _STATUS_RE.findall(response)}
+            if states:
                 return {
-                    'relay1': bool(response[0] & 1),
-                    'relay2': bool(response[0] & 2)
+                    'relay1': states.get(1, False),
+                    'relay2': states.get(2, False)
                 }
             return None
             
@@ -172,6 +277,21 @@ class RelayController:
             self.connected = False
             return None
 
+# Menu text, written in one call per redraw
+_MENU = (
+    "\nCommands:\n"
+    "1: Toggle Relay 1\n"
+    "2: Toggle Relay 2\n"
+    "3: Turn Relay 1 ON\n"
+    "4: Turn Relay 1 OFF\n"
+    "5: Turn Relay 2 ON\n"
+    "6: Turn Relay 2 OFF\n"
+    "7: Open All Relays\n"
+    "8: Close All Relays\n"
+    "s: Get Status\n"
+    "q: Quit\n"
+)
+
 def main():
     """Interactive test routine"""
     print("=== Serial USB Relay Control ===")
@@ -184,17 +304,8 @@ def main():
     
     try:
         while True:
-            print("\nCommands:")
-            print("1: Toggle Relay 1")
-            print("2: Toggle Relay 2")
-            print("3: Turn Relay 1 ON")
-            print("4: Turn Relay 1 OFF")
-            print("5: Turn Relay 2 ON")
-            print("6: Turn Relay 2 OFF")
-            print("7: Open All Relays")
-            print("8: Close All Relays")
-            print("s: Get Status")
-            print("q: Quit")
+            sys.stdout.write(_MENU)
+            sys.stdout.flush()
             
             try:
                 cmd = input("\nEnter command (1-8/s/q): ").lower().strip()
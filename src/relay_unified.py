@@ -7,16 +7,22 @@ Compatible with Windows DLL protocol and Mac HID implementation
 import sys
 import time
 import logging
+import logging.handlers
 import signal
 import atexit
 from typing import Optional, Dict
 
 # Configure logging
+# The log file is only opened once something is written, and records are
+# buffered in memory and flushed every 1024 records, on ERROR, or at exit.
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+_file_handler = logging.FileHandler('relay_unified.log', delay=True)
+_file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
 logging.basicConfig(
     level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
+    format=LOG_FORMAT,
     handlers=[
-        logging.FileHandler('relay_unified.log'),
+        logging.handlers.MemoryHandler(1024, flushLevel=logging.ERROR, target=_file_handler),
         logging.StreamHandler(sys.stdout)
     ]
 )
@@ -33,12 +39,52 @@ class RelayCommands:
         'GET_STATUS': lambda _: [0x0, 0x00, 0x0]
     }
 
+CHANNELS = (1, 2)
+MAX_RETRIES = 3
+# Upper bound on waiting for a status reply; a prompt reply returns at once
+READ_TIMEOUT_MS = 50
+
+# Every report _send_command can send, padded to 8 bytes once at import.
+# Keyed by (command_type, channel); commands without a channel use 0.
+_PRECOMPUTED = {
+    (name, channel): bytes(build(channel) + [0x0] * (8 - len(build(channel))))
+    for name, build in RelayCommands.HID_COMMANDS.items()
+    for channel in (CHANNELS if name.endswith('_ONE') else (0,))
+}
+
+class _DarwinBackend:
+    """hidapi access to the relay on macOS"""
+    
+    def __init__(self):
+        import hid
+        self.device = hid.device()
+    
+    def open(self):
+        self.device.open(0x16c0, 0x05df)
+        # Plain reads never block; status reads use an explicit timeout
+        self.device.set_nonblocking(1)
+        return self.device.get_manufacturer_string()
+    
+    def close(self):
+        self.device.close()
+    
+    def write(self, buf: bytes):
+        self.device.write(buf)
+    
+    def read(self, size: int, timeout_ms: int):
+        return self.device.read(size, timeout_ms=timeout_ms)
+
+# Backend per sys.platform; a Linux or Windows backend only needs an entry here
+_BACKENDS = {
+    'darwin': _DarwinBackend,
+}
+
 class RelayDevice:
     """Unified relay device implementation"""
     
     def __init__(self):
         self.platform = sys.platform
-        self.device = None
+        self._backend = None
         self.connected = False
         self._init_device()
         # Register cleanup handlers
@@ -47,17 +93,16 @@ class RelayDevice:
         signal.signal(signal.SIGTERM, self._signal_handler)
     
     def _init_device(self):
-        """Initialize device based on platform"""
+        """Pick the platform backend once"""
         try:
-            if self.platform == 'darwin':
-                import hid
-                self.device = hid.device()
-            else:
+            backend = _BACKENDS.get(self.platform)
+            if backend is None:
                 raise NotImplementedError(f"Platform {self.platform} not supported")
+            self._backend = backend()
                 
         except Exception as e:
             logger.error(f"Device initialization error: {e}")
-            self.device = None
+            self._backend = None
     
     def _signal_handler(self, signum, frame):
         """Handle interrupt signals"""
@@ -79,14 +124,13 @@ class RelayDevice:
     def open(self) -> bool:
         """Open device connection"""
         try:
-            if not self.device:
+            if not self._backend:
                 return False
                 
-            if self.platform == 'darwin':
-                self.device.open(0x16c0, 0x05df)
-                logger.info(f"Connected to {self.device.get_manufacturer_string()}")
-                self.connected = True
-                return True
+            manufacturer = self._backend.open()
+            logger.info(f"Connected to {manufacturer}")
+            self.connected = True
+            return True
                 
         except Exception as e:
             logger.error(f"Open error: {e}")
@@ -95,38 +139,47 @@ class RelayDevice:
     def close(self):
         """Close device connection"""
         try:
-            if self.device and self.connected:
-                if self.platform == 'darwin':
-                    self.device.close()
+            if self._backend and self.connected:
+                self._backend.close()
                 self.connected = False
-            self.device = None
+            self._backend = None
             
         except Exception as e:
             logger.error(f"Close error: {e}")
     
-    def _send_command(self, command_type: str, channel: int = 1) -> bool:
+    def _write_with_retry(self, buf: bytes, read: bool):
+        """Write a report, retrying device errors with exponential backoff"""
+        for attempt in range(MAX_RETRIES):
+            try:
+                self._backend.write(buf)
+                return self._backend.read(8, READ_TIMEOUT_MS) if read else None
+            except OSError:
+                if attempt == MAX_RETRIES - 1:
+                    raise
+                time.sleep(0.01 * 2 ** attempt)
+    
+    def _write_fire_and_forget(self, buf: bytes):
+        """Write a report that gets no reply"""
+        self._write_with_retry(buf, read=False)
+    
+    def _write_and_read(self, buf: bytes):
+        """Write a report and return the device's reply"""
+        return self._write_with_retry(buf, read=True)
+    
+    def _send_command(self, command_type: str, channel: int = 0) -> bool:
         """Send command to device"""
         try:
-            if not self.device or not self.connected:
+            if not self._backend or not self.connected:
                 return False
                 
-            if self.platform == 'darwin':
-                cmd = RelayCommands.HID_COMMANDS[command_type](channel)
-                # Pad to 8 bytes
-                full_cmd = cmd + [0x0] * (8 - len(cmd))
-                
-                # Send command with retry
-                max_retries = 3
-                for attempt in range(max_retries):
-                    try:
-                        self.device.write(full_cmd)
-                        response = self.device.read(8, timeout_ms=100)
-                        logger.debug(f"Response: {[hex(x) for x in response]}")
-                        return True
-                    except Exception as e:
-                        if attempt == max_retries - 1:
-                            raise
-                        time.sleep(0.1)
+            full_cmd = _PRECOMPUTED.get((command_type, channel))
+            if full_cmd is None:
+                logger.error(f"Invalid command: {command_type} channel {channel}")
+                return False
+            
+            # Relay commands get no reply, so don't wait for one
+            self._write_fire_and_forget(full_cmd)
+            return True
                 
         except Exception as e:
             logger.error(f"Command error: {e}")
@@ -156,24 +209,38 @@ class RelayDevice:
     def get_status(self) -> Optional[Dict[str, bool]]:
         """Get relay status"""
         try:
-            if not self.device or not self.connected:
+            if not self._backend or not self.connected:
                 return None
                 
-            if self.platform == 'darwin':
-                self._send_command('GET_STATUS')
-                response = self.device.read(8, timeout_ms=100)
-                status = response[0]
-                
-                return {
-                    f'relay{i+1}': bool(status & (1 << i))
-                    for i in range(2)  # We only have 2 channels
-                }
+            response = self._write_and_read(_PRECOMPUTED[('GET_STATUS', 0)])
+            if not response:
+                logger.warning("No status reply from device")
+                return None
+            status = response[0]
+            
+            # Two channels, so the bit decode is unrolled
+            return {'relay1': bool(status & 1), 'relay2': bool(status & 2)}
             
         except Exception as e:
             logger.error(f"Status error: {e}")
             self.connected = False
             return None
 
+# Menu text, written in one call per redraw
+_MENU = (
+    "\nCommands:\n"
+    "1: Toggle Relay 1\n"
+    "2: Toggle Relay 2\n"
+    "3: Turn Relay 1 ON\n"
+    "4: Turn Relay 1 OFF\n"
+    "5: Turn Relay 2 ON\n"
+    "6: Turn Relay 2 OFF\n"
+    "7: Open All Channels\n"
+    "8: Close All Channels\n"
+    "s: Get Status\n"
+    "q: Quit\n"
+)
+
 def main():
     """Interactive test routine"""
     print("=== Unified USB Relay Control ===")
@@ -187,17 +254,8 @@ def main():
     
     try:
         while True:
-            print("\nCommands:")
-            print("1: Toggle Relay 1")
-            print("2: Toggle Relay 2")
-            print("3: Turn Relay 1 ON")
-            print("4: Turn Relay 1 OFF")
-            print("5: Turn Relay 2 ON")
-            print("6: Turn Relay 2 OFF")
-            print("7: Open All Channels")
-            print("8: Close All Channels")
-            print("s: Get Status")
-            print("q: Quit")
+            sys.stdout.write(_MENU)
+            sys.stdout.flush()
             
             try:
                 cmd = input("\nEnter command (1-8/s/q): ").lower().strip()
@@ -1,4 +1,5 @@
 import obd
+from operator import attrgetter
 
 def print_command_info(cmd):
     print(f"Name: {cmd.name}")
@@ -13,20 +14,20 @@ print("Available OBD Commands and PIDs:")
 print("-" * 50)
 
 # Print common commands first
-common_commands = [
-    obd.commands.SPEED,              # Vehicle Speed
-    obd.commands.RPM,               # Engine RPM
-    obd.commands.FUEL_LEVEL,        # Fuel Level
-    obd.commands.THROTTLE_POS,      # Throttle Position
-    obd.commands.ENGINE_LOAD,       # Engine Load
-    obd.commands.COOLANT_TEMP,      # Coolant Temperature
-    obd.commands.INTAKE_TEMP,       # Intake Temperature
-    obd.commands.VOLTAGE,           # Battery Voltage
-    obd.commands.TIMING_ADVANCE,    # Timing Advance
-    obd.commands.MAF,               # Mass Air Flow
-    obd.commands.O2_SENSORS,        # O2 Sensors
-    obd.commands.FUEL_STATUS,       # Fuel System Status
-]
+common_commands = attrgetter(
+    'SPEED',           # Vehicle Speed
+    'RPM',             # Engine RPM
+    'FUEL_LEVEL',      # Fuel Level
+    'THROTTLE_POS',    # Throttle Position
+    'ENGINE_LOAD',     # Engine Load
+    'COOLANT_TEMP',    # Coolant Temperature
+    'INTAKE_TEMP',     # Intake Temperature
+    'VOLTAGE',         # Battery Voltage
+    'TIMING_ADVANCE',  # Timing Advance
+    'MAF',             # Mass Air Flow
+    'O2_SENSORS',      # O2 Sensors
+    'FUEL_STATUS',     # Fuel System Status
+)(obd.commands)
 
 print("\nCommonly Used Commands:")
 for cmd in common_commands:
@@ -8,8 +8,10 @@ Supports M-series Mac with CH340 USB-to-Serial chip.
 
 import sys
 import time
+import asyncio
 import logging
 from serial_protocol import RelayProtocol
+from console_input import ConsoleReader
 
 # Configure logging
 logging.basicConfig(
@@ -21,95 +23,110 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-def interactive_test():
+async def _run_blocking(func, *args):
+    """Run a blocking call on the default executor"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, func, *args)
+
+def enable_low_latency(relay):
+    """Put the relay's serial port in low latency mode where supported"""
+    try:
+        relay.serial.set_low_latency_mode(True)
+    except (IOError, NotImplementedError, AttributeError) as e:
+        logger.debug(f"Low latency mode not available: {e}")
+
+async def interactive_test():
     """Interactive relay testing"""
     logger.info("=== NOYITO USB Relay Test ===")
     
+    relay = None
     try:
-        with RelayProtocol() as relay:
-            # Query initial status
-            logger.info("\nQuerying initial status...")
-            status = relay.query_status()
-            logger.info(f"Current states: Relay1={'ON' if status[0] else 'OFF'}, Relay2={'ON' if status[1] else 'OFF'}")
-            
-            # Interactive menu
-            logger.info("\nCommands:")
-            logger.info("1: Toggle Relay 1")
-            logger.info("2: Toggle Relay 2")
-            logger.info("a: Toggle All Relays")
-            logger.info("s: Show Status")
-            logger.info("q: Quit")
-            
-            relay1_state = status[0]
-            relay2_state = status[1]
-            
-            while True:
-                try:
-                    cmd = input("\nEnter command (1/2/a/s/q): ").lower()
+        # Serial I/O runs on the executor and console input on a reader
+        # thread, so neither stalls the loop
+        relay = await _run_blocking(RelayProtocol)
+        enable_low_latency(relay)
+        
+        # Query initial status
+        logger.info("\nQuerying initial status...")
+        status = await _run_blocking(relay.query_status)
+        logger.info(f"Current states: Relay1={'ON' if status[0] else 'OFF'}, Relay2={'ON' if status[1] else 'OFF'}")
+        
+        # Interactive menu
+        logger.info("\nCommands:")
+        logger.info("1: Toggle Relay 1")
+        logger.info("2: Toggle Relay 2")
+        logger.info("a: Toggle All Relays")
+        logger.info("s: Show Status")
+        logger.info("q: Quit")
+        
+        relay1_state = status[0]
+        relay2_state = status[1]
+        console = ConsoleReader()
+        
+        while True:
+            try:
+                cmd = (await console.input("\nEnter command (1/2/a/s/q): ")).lower()
+                
+                if cmd == 'q':
+                    break
+                elif cmd == 's':
+                    status = await _run_blocking(relay.query_status)
+                    logger.info(f"Current states: Relay1={'ON' if status[0] else 'OFF'}, Relay2={'ON' if status[1] else 'OFF'}")
+                elif cmd == '1':
+                    relay1_state = not relay1_state
+                    if await _run_blocking(relay.set_relay, 1, relay1_state):
+                        logger.info(f"✓ Set Relay 1 {'ON' if relay1_state else 'OFF'}")
+                        status = await _run_blocking(relay.query_status)
+                        if status[0] != relay1_state:
+                            logger.error("✗ Relay state verification failed!")
+                    else:
+                        logger.error("✗ Failed to set relay!")
+                elif cmd == '2':
+                    relay2_state = not relay2_state
+                    if await _run_blocking(relay.set_relay, 2, relay2_state):
+                        logger.info(f"✓ Set Relay 2 {'ON' if relay2_state else 'OFF'}")
+                        status = await _run_blocking(relay.query_status)
+                        if status[1] != relay2_state:
+                            logger.error("✗ Relay state verification failed!")
+                    else:
+                        logger.error("✗ Failed to set relay!")
+                elif cmd == 'a':
+                    relay1_state = relay2_state = not relay1_state
                     
-                    if cmd == 'q':
-                        break
-                    elif cmd == 's':
-                        status = relay.query_status()
-                        logger.info(f"Current states: Relay1={'ON' if status[0] else 'OFF'}, Relay2={'ON' if status[1] else 'OFF'}")
-                    elif cmd == '1':
-                        relay1_state = not relay1_state
-                        if relay.set_relay(1, relay1_state):
-                            logger.info(f"✓ Set Relay 1 {'ON' if relay1_state else 'OFF'}")
-                            status = relay.query_status()
-                            if status[0] != relay1_state:
-                                logger.error("✗ Relay state verification failed!")
-                        else:
-                            logger.error("✗ Failed to set relay!")
-                    elif cmd == '2':
-                        relay2_state = not relay2_state
-                        if relay.set_relay(2, relay2_state):
-                            logger.info(f"✓ Set Relay 2 {'ON' if relay2_state else 'OFF'}")
-                            status = relay.query_status()
-                            if status[1] != relay2_state:
-                                logger.error("✗ Relay state verification failed!")
-                        else:
-                            logger.error("✗ Failed to set relay!")
-                    elif cmd == 'a':
-                        relay1_state = relay2_state = not relay1_state
-                        success = True
-                        
-                        # Set both relays
-                        for relay_num in [1, 2]:
-                            if not relay.set_relay(relay_num, relay1_state):
-                                success = False
-                                logger.error(f"✗ Failed to set relay {relay_num}!")
-                                break
-                            time.sleep(0.1)
-                        
-                        if success:
-                            logger.info(f"✓ Set all relays {'ON' if relay1_state else 'OFF'}")
-                            status = relay.query_status()
-                            if status != (relay1_state, relay2_state):
-                                logger.error("✗ Relay state verification failed!")
+                    # Both frames go out in one write, verified once
+                    if await _run_blocking(relay.set_relays, [(1, relay1_state), (2, relay2_state)]):
+                        logger.info(f"✓ Set all relays {'ON' if relay1_state else 'OFF'}")
+                        status = await _run_blocking(relay.query_status)
+                        if status != (relay1_state, relay2_state):
+                            logger.error("✗ Relay state verification failed!")
                     else:
-                        logger.warning("Invalid command")
-                        
-                except Exception as e:
-                    logger.error(f"Command error: {e}")
-                    import traceback
-                    logger.debug(f"Traceback: {traceback.format_exc()}")
+                        logger.error("✗ Failed to set relays!")
+                else:
+                    logger.warning("Invalid command")
                     
-    except KeyboardInterrupt:
+            except EOFError:
+                break
+            except Exception as e:
+                logger.error(f"Command error: {e}")
+                logger.debug("Traceback:", exc_info=True)
+                
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        # Ctrl-C reaches the coroutine as a cancellation under asyncio.run
         logger.info("\nTest interrupted by user")
     except Exception as e:
         logger.error(f"Test error: {e}")
-        import traceback
-        logger.debug(f"Traceback: {traceback.format_exc()}")
+        logger.debug("Traceback:", exc_info=True)
     finally:
         logger.info("\nCleaning up...")
-        try:
-            # Turn all relays off for safety
-            relay.set_relay(1, False)
-            time.sleep(0.1)
-            relay.set_relay(2, False)
-        except:
-            pass
+        if relay is not None:
+            try:
+                # Turn all relays off for safety, before the port is closed
+                relay.set_relay(1, False)
+                time.sleep(0.1)
+                relay.set_relay(2, False)
+            except:
+                pass
+            relay.close()
 
 if __name__ == "__main__":
-    interactive_test() 
\ No newline at end of file
+    asyncio.run(interactive_test()) 
\ No newline at end of file
@@ -9,14 +9,16 @@ A structured test script for USB relay using serial communication:
 4. Status Verification
 """
 
+import re
 import sys
-import time
+import asyncio
 import logging
 import platform
 import subprocess
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Tuple
 import serial
-import serial.tools.list_ports
+from serial_protocol import get_ports, is_ch340
+from console_input import ConsoleReader
 
 # Configure logging with more detail
 logging.basicConfig(
@@ -28,6 +30,12 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Upper bound on each status reply line, so a missing newline can't run the read on
+STATUS_MAX_BYTES = 64
+
+# Matches each channel in a status reply, in whatever order the board sends them
+_STATUS_RE = re.compile(rb'CH([12]):(ON|OFF)')
+
 def check_system_requirements():
     """Verify system requirements for M-series Mac"""
     logger.info("Checking system requirements...")
@@ -39,8 +47,7 @@ def check_system_requirements():
         
     # Check for CH340 driver
     try:
-        ports = list(serial.tools.list_ports.grep("CH340"))
-        if not ports:
+        if not any(is_ch340(p) for p in get_ports()):
             logger.warning("No CH340 devices found - make sure driver is installed")
     except:
         logger.warning("Could not check for CH340 devices")
@@ -51,18 +58,20 @@ def find_relay_port():
     """Find the serial port for the relay"""
     logger.info("Looking for relay serial port...")
     
-    # Try to find CH340 device
+    # One enumeration, shared with the system check, serves both passes
     try:
-        ports = list(serial.tools.list_ports.grep("CH340"))
-        if ports:
-            logger.info(f"Found CH340 device at {ports[0].device}")
-            return ports[0].device
+        ports = get_ports()
     except:
-        pass
+        return None
+    
+    # Try to find CH340 device
+    ch340_ports = [p for p in ports if is_ch340(p)]
+    if ch340_ports:
+        logger.info(f"Found CH340 device at {ch340_ports[0].device}")
+        return ch340_ports[0].device
         
     # List all potential ports
     try:
-        ports = list(serial.tools.list_ports.comports())
         for port in ports:
             logger.debug(f"Found port: {port.device} - {port.description}")
             if "USB" in port.description:
@@ -106,9 +115,20 @@ class RelayTester:
                 bytesize=serial.EIGHTBITS,
                 parity=serial.PARITY_NONE,
                 stopbits=serial.STOPBITS_ONE,
-                timeout=1
+                # Bounds the status read; a prompt reply returns at once
+                timeout=0.2
             )
             
+            # Driver buffer sizes can only be set on Windows
+            if hasattr(self.serial, 'set_buffer_size'):
+                self.serial.set_buffer_size(rx_size=4096)
+            
+            # Drop the USB-serial latency timer so short replies arrive promptly
+            try:
+                self.serial.set_low_latency_mode(True)
+            except (IOError, NotImplementedError, AttributeError) as e:
+                logger.debug(f"Low latency mode not available: {e}")
+            
             # Test connection by querying status
             if self.get_relay_states():
                 self.connected = True
@@ -120,8 +140,7 @@ class RelayTester:
             
         except Exception as e:
             logger.error(f"Connection failed: {e}")
-            import traceback
-            logger.debug(f"Traceback: {traceback.format_exc()}")
+            logger.debug("Traceback:", exc_info=True)
             return False
     
     def calculate_checksum(self, data: List[int]) -> int:
@@ -130,13 +149,21 @@ class RelayTester:
     
     def build_command(self, relay_num: int, state: bool) -> bytes:
         """Build command with proper format and checksum"""
-        cmd = [
-            self.START_FLAG,           # Start flag
-            relay_num,                 # Switch address
-            0x01 if state else 0x00    # Operation
-        ]
-        cmd.append(self.calculate_checksum(cmd))  # Add checksum
-        return bytes(cmd)
+        # Start flag, switch address, operation and checksum packed into one
+        # 32-bit word, most significant byte first
+        op = self.STATE_ON if state else self.STATE_OFF
+        word = (self.START_FLAG << 24) | (relay_num << 16) | (op << 8)
+        return (word | ((self.START_FLAG + relay_num + op) & 0xFF)).to_bytes(4, 'big')
+    
+    def build_batch(self, ops: List[Tuple[int, bool]]) -> bytes:
+        """Build the frames for several (relay_num, state) pairs"""
+        # One preallocated buffer filled in a single pass, no per-frame lists
+        buf = bytearray(4 * len(ops))
+        for i, (relay_num, state) in enumerate(ops):
+            op = self.STATE_ON if state else self.STATE_OFF
+            buf[4 * i:4 * i + 4] = (self.START_FLAG, relay_num, op,
+                                    (self.START_FLAG + relay_num + op) & 0xFF)
+        return bytes(buf)
     
     def get_relay_states(self) -> List[bool]:
         """Query current relay states"""
@@ -145,18 +172,24 @@ class RelayTester:
             return self.relay_states
             
         try:
-            # Send query command
+            # Drop stale bytes, then read the reply: one line per channel
+            self.serial.reset_input_buffer()
             self.serial.write(bytes([self.QUERY_CMD]))
-            time.sleep(0.1)  # Wait for response
             
-            # Read response
-            if self.serial.in_waiting:
-                response = self.serial.read_until(b'\n').decode('ascii')
-                logger.debug(f"Status response: {response}")
+            response = b''
+            for _ in self.relay_states:
+                line = self.serial.read_until(b'\n', STATUS_MAX_BYTES)
+                if not line:
+                    # Timed out; parse whatever arrived
+                    break
+                response += line
+            if response:
+                logger.debug(f"Status response: {response!r}")
                 
-                # Parse response
-                self.relay_states[0] = "CH1:ON" in response
-                self.relay_states[1] = "CH2:ON" in response
+                # Parse the raw bytes; no decode needed. Channels missing from
+                # the reply are reported off rather than keeping a stale state
+                states = {int(m.group(1)): m.group(2) == b'ON' for m in _STATUS_RE.finditer(response)}
+                self.relay_states = [states.get(ch, False) for ch in range(1, len(self.relay_states) + 1)]
                 
                 logger.debug(f"Parsed states: {[int(s) for s in self.relay_states]}")
             else:
@@ -179,8 +212,8 @@ class RelayTester:
             logger.info(f"Sending command: {[hex(x) for x in cmd]}")
             
             self.serial.write(cmd)
-            time.sleep(0.1)  # Wait for relay to respond
             
+            # The status query is handled after the command, so no wait is needed
             if verify:
                 # Read back states
                 states = self.get_relay_states()
@@ -198,8 +231,31 @@ class RelayTester:
             
         except Exception as e:
             logger.error(f"Command failed: {e}")
-            import traceback
-            logger.debug(f"Traceback: {traceback.format_exc()}")
+            logger.debug("Traceback:", exc_info=True)
+            return False
+    
+    def set_relays(self, ops: List[Tuple[int, bool]], verify: bool = True) -> bool:
+        """Send several relay commands in one write and verify them once"""
+        if not self.connected:
+            logger.error("Not connected to relay")
+            return False
+            
+        try:
+            cmd = self.build_batch(ops)
+            logger.info(f"Sending command: {[hex(x) for x in cmd]}")
+            
+            self.serial.write(cmd)
+            
+            if verify:
+                states = self.get_relay_states()
+                logger.info(f"Current relay states: Relay1={'ON' if states[0] else 'OFF'}, Relay2={'ON' if states[1] else 'OFF'}")
+                return all(states[n - 1] == s for n, s in ops)
+            
+            return True
+            
+        except Exception as e:
+            logger.error(f"Command failed: {e}")
+            logger.debug("Traceback:", exc_info=True)
             return False
     
     def test_relay(self, relay_num: int, state: bool) -> bool:
@@ -213,13 +269,8 @@ class RelayTester:
         if relay_num in [1, 2]:
             success = self.send_command(relay_num, state, verify=True)
         else:
-            # Control both relays
-            success = True
-            for relay in [1, 2]:
-                if not self.send_command(relay, state, verify=True):
-                    success = False
-                    break
-                time.sleep(0.1)  # Small delay between relay commands
+            # Control both relays with one write and one verification
+            success = self.set_relays([(1, state), (2, state)], verify=True)
         
         if success:
             logger.info(f"✓ Relay {relay_num} {'ON' if state else 'OFF'}")
@@ -236,28 +287,35 @@ class RelayTester:
         if self.connected:
             try:
                 logger.info("\nCleaning up...")
-                # Turn all relays off
-                for relay in [1, 2]:
-                    self.send_command(relay, False)
-                    time.sleep(0.1)
+                # Turn all relays off in one write; only read back the
+                # states when they would be logged
+                self.set_relays([(1, False), (2, False)], verify=False)
+                if logger.isEnabledFor(logging.INFO):
+                    states = self.get_relay_states()
+                    logger.info(f"Final relay states: Relay1={'ON' if states[0] else 'OFF'}, Relay2={'ON' if states[1] else 'OFF'}")
                 self.serial.close()
                 logger.info("✓ Relay connection closed")
             except Exception as e:
                 logger.error(f"Cleanup error: {e}")
-                import traceback
-                logger.debug(f"Traceback: {traceback.format_exc()}")
+                logger.debug("Traceback:", exc_info=True)
+
+async def _run_blocking(func, *args):
+    """Run a blocking call on the default executor"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, func, *args)
 
-def interactive_test():
+async def interactive_test():
     """Interactive relay testing with error handling"""
     try:
-        tester = RelayTester()
+        tester = await _run_blocking(RelayTester)
     except Exception as e:
         logger.error(f"Could not initialize tester: {e}")
         return
     
     try:
-        # Connection
-        if not tester.connect():
+        # Connection; serial I/O runs on the executor and console input on
+        # a reader thread, so neither stalls the loop
+        if not await _run_blocking(tester.connect):
             logger.error("Failed to connect to relay!")
             return
         
@@ -272,42 +330,44 @@ def interactive_test():
         
         relay1_state = False
         relay2_state = False
+        console = ConsoleReader()
         
         while True:
             try:
-                cmd = input("\nEnter command (1/2/a/s/q): ").lower()
+                cmd = (await console.input("\nEnter command (1/2/a/s/q): ")).lower()
                 
                 if cmd == 'q':
                     break
                 elif cmd == 's':
-                    states = tester.get_relay_states()
+                    states = await _run_blocking(tester.get_relay_states)
                     logger.info(f"Current states: Relay1={'ON' if states[0] else 'OFF'}, Relay2={'ON' if states[1] else 'OFF'}")
                 elif cmd == '1':
                     relay1_state = not relay1_state
-                    tester.test_relay(1, relay1_state)
+                    await _run_blocking(tester.test_relay, 1, relay1_state)
                 elif cmd == '2':
                     relay2_state = not relay2_state
-                    tester.test_relay(2, relay2_state)
+                    await _run_blocking(tester.test_relay, 2, relay2_state)
                 elif cmd == 'a':
                     relay1_state = relay2_state = not relay1_state
-                    tester.test_relay(0, relay1_state)  # 0 means all relays
+                    await _run_blocking(tester.test_relay, 0, relay1_state)  # 0 means all relays
                 else:
                     logger.warning("Invalid command")
                     
+            except EOFError:
+                break
             except Exception as e:
                 logger.error(f"Command error: {e}")
-                import traceback
-                logger.debug(f"Traceback: {traceback.format_exc()}")
+                logger.debug("Traceback:", exc_info=True)
                 
-    except KeyboardInterrupt:
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        # Ctrl-C reaches the coroutine as a cancellation under asyncio.run
         logger.info("\nTest interrupted by user")
     except Exception as e:
         logger.error(f"Test error: {e}")
-        import traceback
-        logger.debug(f"Traceback: {traceback.format_exc()}")
+        logger.debug("Traceback:", exc_info=True)
     finally:
         tester.cleanup()
 
 if __name__ == "__main__":
     logger.info("=== USB Relay Test Utility ===")
-    interactive_test() 
\ No newline at end of file
+    asyncio.run(interactive_test()) 
\ No newline at end of file
@@ -8,10 +8,44 @@ Specifically handles M-series Mac requirements.
 
 import sys
 import os
+import glob
+import shutil
 import logging
 import platform
 import subprocess
-from typing import List, Dict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict
+from importlib.metadata import distributions
+
+try:
+    from packaging.requirements import Requirement
+except ImportError:
+    Requirement = None
+
+# /dev node names of USB serial devices; wchusbserial is the WCH CH340 driver
+USB_SERIAL_PREFIXES = (
+    "tty.usbserial", "tty.usbmodem", "tty.wchusbserial",
+    "cu.usbserial", "cu.usbmodem", "cu.wchusbserial"
+)
+
+def _brew_formulae() -> str:
+    """List installed Homebrew formulae, one per line"""
+    return subprocess.run(["brew", "list", "--formula", "-1"],
+                          capture_output=True, text=True, check=True).stdout
+
+def _serial_ports():
+    """Enumerate serial ports through the project's serial_protocol module"""
+    from serial_protocol import get_ports
+    return get_ports()
+
+def _installed_versions() -> Dict[str, str]:
+    """Map normalised distribution name to installed version, from one metadata scan"""
+    installed = {}
+    for dist in distributions():
+        name = dist.metadata['Name']
+        if name:
+            installed.setdefault(name.lower().replace('_', '-'), dist.version)
+    return installed
 
 class DependencyVerifier:
     def __init__(self):
@@ -19,6 +53,8 @@ class DependencyVerifier:
         self.missing_packages = []
         self.hardware_issues = []
         self.system_issues = []
+        # Futures for the slow lookups, started together by verify_all
+        self._prefetched = {}
         
         # Required Python packages
         self.required_packages = {
@@ -37,17 +73,20 @@ class DependencyVerifier:
         """Check required Python packages"""
         self.logger.info("Checking Python packages...")
         
-        import pkg_resources
-        installed = {pkg.key: pkg.version for pkg in pkg_resources.working_set}
+        installed = self._lookup("installed", _installed_versions)
         
         for package, requirement in self.required_packages.items():
-            try:
-                pkg_resources.require(requirement)
-                self.logger.info(f"✓ {package} {installed.get(package, 'unknown version')}")
-            except Exception as e:
+            version = installed.get(package.lower())
+            if version is None:
                 self.missing_packages.append(requirement)
-                self.logger.warning(f"✗ {package} not found: {e}")
-                
+                self.logger.warning(f"✗ {package} not found")
+            elif Requirement is not None and not Requirement(requirement).specifier.contains(version, prereleases=True):
+                # Without packaging installed only presence is checked
+                self.missing_packages.append(requirement)
+                self.logger.warning(f"✗ {package} {version} does not satisfy {requirement}")
+            else:
+                self.logger.info(f"✓ {package} {version}")
+            
     def check_system_packages(self):
         """Check required system packages"""
         self.logger.info("\nChecking system packages...")
@@ -55,12 +94,15 @@ class DependencyVerifier:
         if platform.system() == "Darwin":
             try:
                 # Check if Homebrew is installed
-                subprocess.run(["brew", "--version"], capture_output=True, check=True)
+                if shutil.which("brew") is None:
+                    raise FileNotFoundError("brew is not on PATH")
+                
+                # One listing of installed formulae, checked locally per package
+                out = self._lookup("brew", _brew_formulae)
+                installed = set(out.split())
                 
-                # Check each required package
                 for package in self.brew_packages:
-                    result = subprocess.run(["brew", "list", package], capture_output=True)
-                    if result.returncode == 0:
+                    if package in installed:
                         self.logger.info(f"✓ {package}")
                     else:
                         self.system_issues.append(f"Missing Homebrew package: {package}")
@@ -68,19 +110,19 @@ class DependencyVerifier:
             except Exception as e:
                 self.system_issues.append("Homebrew not found")
                 self.logger.warning(f"✗ Homebrew not found: {e}")
-                
+            
     def check_hardware_support(self):
         """Check hardware support"""
         self.logger.info("\nChecking hardware support...")
         
         # Check serial ports
         try:
-            import serial.tools.list_ports
-            ports = list(serial.tools.list_ports.comports())
+            from serial_protocol import is_ch340
+            ports = self._lookup("ports", _serial_ports)
             self.logger.info(f"Found {len(ports)} serial ports")
             
-            # Look for CH340 device
-            ch340_ports = list(serial.tools.list_ports.grep("CH340"))
+            # Look for CH340 device in the same enumeration
+            ch340_ports = [p for p in ports if is_ch340(p)]
             if ch340_ports:
                 self.logger.info("✓ Found CH340 USB-Serial device")
                 for port in ch340_ports:
@@ -100,34 +142,50 @@ class DependencyVerifier:
         self.logger.info("\nChecking permissions...")
         
         if platform.system() == "Darwin":
-            # Check USB device access
-            try:
-                subprocess.run(["system_profiler", "SPUSBDataType"], capture_output=True, check=True)
+            serial_nodes = glob.glob("/dev/tty.*") + glob.glob("/dev/cu.*")
+            
+            # USB serial nodes only appear once the driver can see the device,
+            # which is much cheaper to check than a system_profiler run
+            usb_nodes = [path for path in serial_nodes
+                         if os.path.basename(path).startswith(USB_SERIAL_PREFIXES)]
+            if usb_nodes:
                 self.logger.info("✓ Has USB device access")
-            except Exception as e:
-                self.system_issues.append("No USB device access")
-                self.logger.warning(f"✗ No USB device access: {e}")
-                
-            # Check serial port access
-            try:
-                for dev in os.listdir("/dev"):
-                    if dev.startswith("tty.") or dev.startswith("cu."):
-                        path = os.path.join("/dev", dev)
-                        if os.access(path, os.R_OK | os.W_OK):
-                            self.logger.info(f"✓ Has access to {path}")
-                        else:
-                            self.system_issues.append(f"No access to {path}")
-                            self.logger.warning(f"✗ No access to {path}")
-            except Exception as e:
-                self.system_issues.append("Error checking serial port permissions")
-                self.logger.warning(f"✗ Error checking serial port permissions: {e}")
+            else:
+                self.system_issues.append("No USB serial device nodes in /dev")
+                self.logger.warning("✗ No USB serial device nodes in /dev")
                 
+            # Check serial port access; one bad node doesn't stop the rest
+            for path in serial_nodes:
+                try:
+                    has_access = os.access(path, os.R_OK | os.W_OK)
+                except OSError as e:
+                    self.system_issues.append(f"Error checking {path}")
+                    self.logger.warning(f"✗ Error checking {path}: {e}")
+                    continue
+                if has_access:
+                    self.logger.info(f"✓ Has access to {path}")
+                else:
+                    self.system_issues.append(f"No access to {path}")
+                    self.logger.warning(f"✗ No access to {path}")
+            
+    def _lookup(self, name: str, func):
+        """Result of a slow lookup, prefetched by verify_all or run now"""
+        future = self._prefetched.pop(name, None)
+        return future.result() if future is not None else func()
+            
     def verify_all(self) -> bool:
         """Run all verification checks"""
-        self.check_python_packages()
-        self.check_system_packages()
-        self.check_hardware_support()
-        self.check_permissions()
+        # Only the subprocess, metadata and USB waits run side by side; the
+        # checks themselves run in order so their output and issues stay ordered
+        lookups = {"installed": _installed_versions, "ports": _serial_ports}
+        if platform.system() == "Darwin" and shutil.which("brew") is not None:
+            lookups["brew"] = _brew_formulae
+        with ThreadPoolExecutor(max_workers=len(lookups)) as executor:
+            self._prefetched = {name: executor.submit(func) for name, func in lookups.items()}
+            self.check_python_packages()
+            self.check_system_packages()
+            self.check_hardware_support()
+            self.check_permissions()
         
         # Report results
         self.logger.info("\n=== Verification Results ===")
@@ -214,8 +272,7 @@ def main():
         logger.info("\nVerification interrupted by user")
     except Exception as e:
         logger.error(f"\nVerification error: {e}")
-        import traceback
-        logger.debug(f"Traceback: {traceback.format_exc()}")
+        logger.debug("Traceback:", exc_info=True)
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file